@@ -0,0 +1,189 @@
+from __future__ import annotations
+
+import asyncio
+import re
+from collections import defaultdict, deque
+from dataclasses import dataclass, field
+
+from .asgi import send_json
+from .config import (
+    ADMISSION_INTERACTIVE_RESERVED,
+    ADMISSION_QUEUE_TIMEOUT_SECONDS,
+    ADMISSION_REPORT_LIMIT,
+    ADMISSION_RETRY_AFTER_SECONDS,
+    ADMISSION_TOTAL_LIMIT,
+)
+from .metrics import metrics
+
+
+@dataclass
+class Lane:
+    name: str
+    limit: int
+    max_queue: int
+    uses_reserve: bool = False
+    active: int = 0
+    waiters: deque = field(default_factory=deque)
+
+
+@dataclass(frozen=True)
+class RouteRule:
+    method: str
+    pattern: re.Pattern
+    lane: str | None  # None: exempt (long-lived streams, health checks)
+    limit: int | None = None
+
+
+# First match wins; unmatched requests go to the "standard" lane.
+ROUTE_RULES = [
+    RouteRule("GET", re.compile(r"^/(health|metrics)$"), None),
+    RouteRule("GET", re.compile(r"^/(sessions|courses)/\d+/attendance/stream$"), None),
+    RouteRule("GET", re.compile(r"^/students/\d+/grades$"), "report", limit=2),
+    RouteRule("GET", re.compile(r"^/courses/\d+/grades/summary$"), "report", limit=2),
+    RouteRule("GET", re.compile(r"^/courses/\d+/attendance/summary$"), "report", limit=2),
+    RouteRule("GET", re.compile(r"^/reports/report-cards$"), "report", limit=1),
+    RouteRule("POST", re.compile(r"^/courses/\d+/grades/what-if$"), "report", limit=2),
+    RouteRule("POST", re.compile(r"^/sessions/\d+/attendance/bulk$"), "interactive"),
+    RouteRule("POST", re.compile(r"^/assessments/\d+/scores/bulk$"), "interactive"),
+    RouteRule("POST", re.compile(r"^/courses/\d+/enrollments$"), "interactive"),
+    RouteRule("POST", re.compile(r"^/auth/login$"), "interactive"),
+]
+
+_STANDARD = RouteRule("*", re.compile(""), "standard")
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, status: int, detail: str):
+        self.status = status
+        self.detail = detail
+
+
+class AdmissionController:
+    """Concurrency limits per cost class (lane) and per route, with bounded FIFO queues.
+
+    All lanes share ``total_limit`` slots, but only the interactive lane may use the
+    last ``reserved`` of them, so report traffic can never starve attendance entry.
+    Runs on the event loop only, so no locking is needed.
+    """
+
+    def __init__(
+        self,
+        total_limit: int = ADMISSION_TOTAL_LIMIT,
+        reserved: int = ADMISSION_INTERACTIVE_RESERVED,
+        report_limit: int = ADMISSION_REPORT_LIMIT,
+        queue_timeout: float = ADMISSION_QUEUE_TIMEOUT_SECONDS,
+    ):
+        self.total_limit = total_limit
+        self.reserved = min(reserved, total_limit)
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self.route_active: dict[str, int] = defaultdict(int)
+        shared = max(total_limit - self.reserved, 1)
+        # Wake-up order doubles as priority order.
+        self.lanes = {
+            "interactive": Lane("interactive", total_limit, max_queue=total_limit * 4, uses_reserve=True),
+            "standard": Lane("standard", shared, max_queue=shared * 2),
+            "report": Lane("report", min(report_limit, shared), max_queue=report_limit * 2),
+        }
+        self._publish()
+
+    def classify(self, method: str, path: str) -> RouteRule:
+        for rule in ROUTE_RULES:
+            if rule.method == method and rule.pattern.match(path):
+                return rule
+        return _STANDARD
+
+    async def acquire(self, rule: RouteRule) -> None:
+        lane = self.lanes[rule.lane]
+        if not lane.waiters and self._can_admit(lane, rule):
+            self._grant(lane, rule)
+            return
+        if len(lane.waiters) >= lane.max_queue:
+            metrics.inc("admission_rejected", lane=lane.name, reason="queue_full")
+            raise AdmissionRejected(429, "Too many requests, please retry later")
+        future = asyncio.get_running_loop().create_future()
+        waiter = (future, rule)
+        lane.waiters.append(waiter)
+        self._publish()
+        try:
+            await asyncio.wait_for(future, self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._drop(lane, waiter)
+            metrics.inc("admission_rejected", lane=lane.name, reason="timeout")
+            raise AdmissionRejected(503, "Server is busy, please retry later")
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self.release(rule)
+            else:
+                self._drop(lane, waiter)
+            raise
+
+    def release(self, rule: RouteRule) -> None:
+        lane = self.lanes[rule.lane]
+        lane.active -= 1
+        self.active -= 1
+        self.route_active[rule.pattern.pattern] -= 1
+        self._wake()
+        self._publish()
+
+    def _can_admit(self, lane: Lane, rule: RouteRule) -> bool:
+        if lane.active >= lane.limit:
+            return False
+        if rule.limit is not None and self.route_active[rule.pattern.pattern] >= rule.limit:
+            return False
+        ceiling = self.total_limit if lane.uses_reserve else self.total_limit - self.reserved
+        return self.active < ceiling
+
+    def _grant(self, lane: Lane, rule: RouteRule) -> None:
+        lane.active += 1
+        self.active += 1
+        self.route_active[rule.pattern.pattern] += 1
+        self._publish()
+
+    def _wake(self) -> None:
+        for lane in self.lanes.values():
+            for waiter in list(lane.waiters):
+                future, rule = waiter
+                if future.done():
+                    lane.waiters.remove(waiter)
+                    continue
+                if self._can_admit(lane, rule):
+                    lane.waiters.remove(waiter)
+                    self._grant(lane, rule)
+                    future.set_result(None)
+
+    def _drop(self, lane: Lane, waiter) -> None:
+        if waiter in lane.waiters:
+            lane.waiters.remove(waiter)
+        self._publish()
+
+    def _publish(self) -> None:
+        metrics.set_gauge("admission_active_total", self.active)
+        metrics.set_gauge("admission_limit_total", self.total_limit)
+        for lane in self.lanes.values():
+            metrics.set_gauge("admission_active", lane.active, lane=lane.name)
+            metrics.set_gauge("admission_queued", len(lane.waiters), lane=lane.name)
+            metrics.set_gauge("admission_limit", lane.limit, lane=lane.name)
+
+
+class AdmissionMiddleware:
+    def __init__(self, app, controller: AdmissionController | None = None):
+        self.app = app
+        self.controller = controller or AdmissionController()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        rule = self.controller.classify(scope["method"], scope["path"])
+        if rule.lane is None:
+            return await self.app(scope, receive, send)
+        try:
+            await self.controller.acquire(rule)
+        except AdmissionRejected as exc:
+            retry_after = [(b"retry-after", str(ADMISSION_RETRY_AFTER_SECONDS).encode())]
+            await send_json(send, exc.status, {"detail": exc.detail}, retry_after)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release(rule)
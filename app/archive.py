@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+import os
+import sqlite3
+from datetime import date
+
+from sqlalchemy import bindparam, create_engine, func, select, text
+from sqlalchemy.schema import CreateIndex, CreateTable
+from sqlalchemy.orm import Session
+
+from . import search
+from .changelog import SYNCED_MODELS
+from .database import Base, TenantDatabase, current_database
+from .models import Session as CourseSession
+
+# The archive file carries the same tables as the hot database (minus users and the
+# change log); students are copied as snapshots so archived enrollments still resolve.
+# Each tenant has its own archive file, opened read-only through TenantDatabase.
+ARCHIVE_TABLES = [model.__table__ for model in SYNCED_MODELS.values()]
+ARCHIVE_STUDENTS = SYNCED_MODELS["students"].__table__
+
+# (table, filter on the rows belonging to the archived courses), parents first.
+_COPY_PLAN = [
+    ("courses", "id IN :course_ids"),
+    ("enrollments", "course_id IN :course_ids"),
+    ("sessions", "course_id IN :course_ids"),
+    ("assessments", "course_id IN :course_ids"),
+    ("attendance_records", "session_id IN (SELECT id FROM main.sessions WHERE course_id IN :course_ids)"),
+    ("scores", "assessment_id IN (SELECT id FROM main.assessments WHERE course_id IN :course_ids)"),
+]
+
+
+def ensure_archive_schema() -> str:
+    path = current_database().archive_path
+    if not os.path.exists(path):
+        writer = create_engine(f"sqlite:///{path}")
+        Base.metadata.create_all(bind=writer, tables=ARCHIVE_TABLES)
+        writer.dispose()
+    return path
+
+
+def ensure_autoincrement(tenant: TenantDatabase) -> None:
+    """Rebuild hot tables created before they were AUTOINCREMENT.
+
+    Plain INTEGER PRIMARY KEY tables hand the highest freed id to the next row, so an
+    id already moved to the archive (or sent to sync clients through the change log)
+    would be issued again. Each rebuilt table's sequence starts past every id seen in
+    the table, its archive and the change log.
+    """
+    dialect = tenant.engine.dialect
+    conn = sqlite3.connect(tenant.path, isolation_level=None)
+    try:
+        existing = dict(conn.execute("SELECT name, sql FROM sqlite_master WHERE type = 'table'").fetchall())
+        pending = [t for t in ARCHIVE_TABLES if t.name in existing and "AUTOINCREMENT" not in existing[t.name].upper()]
+        if not pending:
+            return
+        has_archive = os.path.exists(tenant.archive_path)
+        if has_archive:
+            conn.execute("ATTACH DATABASE ? AS archive", (tenant.archive_path,))
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for table in pending:
+                name = table.name
+                columns = ", ".join(c.name for c in table.columns)
+                ddl = str(CreateTable(table).compile(dialect=dialect))
+                conn.execute(ddl.replace(f"CREATE TABLE {name} ", f"CREATE TABLE {name}__new ", 1))
+                conn.execute(f"INSERT INTO {name}__new ({columns}) SELECT {columns} FROM main.{name}")
+                conn.execute(f"DROP TABLE main.{name}")
+                conn.execute(f"ALTER TABLE {name}__new RENAME TO {name}")
+                for index in table.indexes:
+                    conn.execute(str(CreateIndex(index).compile(dialect=dialect)))
+                sources = [
+                    f"SELECT max(id) FROM main.{name}",
+                    f"SELECT max(row_id) FROM main.change_log WHERE table_name = '{name}'",
+                ]
+                if has_archive:
+                    sources.append(f"SELECT max(id) FROM archive.{name}")
+                seq = max(conn.execute(sql).fetchone()[0] or 0 for sql in sources)
+                conn.execute("DELETE FROM main.sqlite_sequence WHERE name = ?", (name,))
+                conn.execute("INSERT INTO main.sqlite_sequence (name, seq) VALUES (?, ?)", (name, seq))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+    finally:
+        conn.close()
+
+
+def get_archive_db():
+    ensure_archive_schema()
+    db = current_database().ArchiveSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def closed_course_ids(db: Session, before: date) -> list[int]:
+    """Courses that have sessions and whose last session is before ``before``."""
+    stmt = (
+        select(CourseSession.course_id)
+        .group_by(CourseSession.course_id)
+        .having(func.max(CourseSession.session_date) < before)
+    )
+    return list(db.scalars(stmt))
+
+
+def archive_closed_terms(before: date) -> dict:
+    """Move closed courses with their sessions, attendance, assessments and scores
+    into the archive file in one transaction over both databases (ATTACH)."""
+    archive_path = ensure_archive_schema()
+    counts = {table: 0 for table, _ in _COPY_PLAN}
+    with current_database().engine.connect() as conn:
+        # ATTACH/DETACH are not allowed inside a transaction, so they wrap the session.
+        conn.exec_driver_sql("ATTACH DATABASE ? AS archive", (archive_path,))
+        conn.commit()
+        try:
+            with Session(bind=conn) as db:
+                course_ids = closed_course_ids(db, before)
+                if course_ids:
+                    _move(db, course_ids, counts)
+                    for course_id in course_ids:
+                        search.remove_course(db, course_id)
+                db.commit()
+        finally:
+            conn.exec_driver_sql("DETACH DATABASE archive")
+            conn.commit()
+    return {"before": before, "courses_archived": counts["courses"], "rows": counts}
+
+
+def _move(db: Session, course_ids: list[int], counts: dict) -> None:
+    params = {"course_ids": course_ids}
+
+    def run(sql: str):
+        return db.execute(text(sql).bindparams(bindparam("course_ids", expanding=True)), params)
+
+    # Student snapshots are refreshed by id; any other conflict (e.g. an email now used
+    # by a different student) raises IntegrityError and the whole move rolls back.
+    students = ", ".join(c.name for c in ARCHIVE_STUDENTS.columns)
+    refresh = ", ".join(f"{c.name} = excluded.{c.name}" for c in ARCHIVE_STUDENTS.columns if c.name != "id")
+    run(
+        f"INSERT INTO archive.students ({students}) SELECT {students} FROM main.students WHERE id IN ("
+        "SELECT student_id FROM main.enrollments WHERE course_id IN :course_ids "
+        "UNION SELECT student_id FROM main.scores WHERE assessment_id IN "
+        "(SELECT id FROM main.assessments WHERE course_id IN :course_ids) "
+        "UNION SELECT student_id FROM main.attendance_records WHERE session_id IN "
+        "(SELECT id FROM main.sessions WHERE course_id IN :course_ids)) "
+        f"ON CONFLICT (id) DO UPDATE SET {refresh}"
+    )
+    for table, where in _COPY_PLAN:
+        # Hot ids are AUTOINCREMENT and never reissued, so an id already in the archive
+        # is a real conflict: fail instead of overwriting what was archived before.
+        copied = run(f"INSERT INTO archive.{table} SELECT * FROM main.{table} WHERE {where}")
+        counts[table] = copied.rowcount
+        # Sync clients see archived rows leave the hot set as deletes.
+        run(
+            f"INSERT INTO main.change_log (table_name, row_id, op, changed_at) "
+            f"SELECT '{table}', id, 'delete', CURRENT_TIMESTAMP FROM main.{table} WHERE {where}"
+        )
+    # Children first: the filters above still need the parent rows.
+    for table, where in reversed(_COPY_PLAN):
+        run(f"DELETE FROM main.{table} WHERE {where}")
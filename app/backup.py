@@ -0,0 +1,269 @@
+from __future__ import annotations
+
+import argparse
+import os
+import re
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime
+
+from .config import BACKUP_DIR, BACKUP_MAX_RESTARTS, BACKUP_PAGES_PER_STEP, BACKUP_STEP_SLEEP_MS
+from .database import current_database, current_tenant, tenants
+from .metrics import metrics
+
+
+@dataclass
+class SnapshotFile:
+    source: str
+    destination: str
+    pages_total: int = 0
+    pages_done: int = 0
+    restarts: int = 0
+    integrity: str | None = None
+
+
+@dataclass
+class BackupJob:
+    id: str
+    tenant: str
+    files: list[SnapshotFile]  # the tenant database, then its archive when there is one
+    method: str
+    status: str = "pending"  # pending / running / verifying / done / failed
+    started_at: datetime = field(default_factory=datetime.utcnow)
+    duration_seconds: float | None = None
+    integrity: str | None = None
+    error: str | None = None
+
+    @property
+    def destination(self) -> str:
+        return self.files[0].destination
+
+    @property
+    def pages_total(self) -> int:
+        return sum(f.pages_total for f in self.files)
+
+    @property
+    def pages_done(self) -> int:
+        return sum(f.pages_done for f in self.files)
+
+    @property
+    def restarts(self) -> int:
+        return sum(f.restarts for f in self.files)
+
+    @property
+    def progress(self) -> float:
+        if self.status == "done":
+            return 1.0
+        return round(self.pages_done / self.pages_total, 4) if self.pages_total else 0.0
+
+
+_jobs: OrderedDict[str, BackupJob] = OrderedDict()
+_jobs_lock = threading.Lock()
+_MAX_JOBS = 20
+
+
+_SNAPSHOT_NAME = re.compile(r"^[A-Za-z0-9][A-Za-z0-9._-]{0,99}$")
+
+
+def snapshot_path(name: str | None = None) -> str:
+    """Path for a snapshot of the current tenant: a bare file name under BACKUP_DIR/<tenant>/."""
+    if name is None:
+        name = f"{datetime.utcnow():%Y%m%d-%H%M%S}-{uuid.uuid4().hex[:6]}.db"
+    if not _SNAPSHOT_NAME.match(name):
+        raise ValueError(f"invalid snapshot name: {name!r}")
+    return os.path.abspath(os.path.join(BACKUP_DIR, current_tenant.get(), name))
+
+
+def archive_snapshot_path(destination: str) -> str:
+    """Where the archive snapshot goes next to ``destination``: ``<name>.archive.db``."""
+    root, ext = os.path.splitext(destination)
+    return f"{root}.archive{ext}"
+
+
+def new_job(destination: str | None = None, method: str = "backup") -> BackupJob:
+    tenant = current_database()
+    destination = os.path.abspath(destination or snapshot_path())
+    files = [SnapshotFile(tenant.path, destination)]
+    if os.path.exists(tenant.archive_path):
+        files.append(SnapshotFile(tenant.archive_path, archive_snapshot_path(destination)))
+    for snapshot in files:
+        if os.path.exists(snapshot.destination):
+            # Never replace an existing file (least of all a live database) with a snapshot.
+            raise FileExistsError(snapshot.destination)
+    if method == "vacuum" and _journal_mode(tenant.path) != "wal":
+        # VACUUM INTO reads in one transaction; only WAL lets writers commit meanwhile.
+        raise ValueError("method vacuum needs the database in WAL mode")
+    job = BackupJob(id=uuid.uuid4().hex[:12], tenant=tenant.name, files=files, method=method)
+    with _jobs_lock:
+        _jobs[job.id] = job
+        while len(_jobs) > _MAX_JOBS:
+            _jobs.popitem(last=False)
+    return job
+
+
+def get_job(job_id: str) -> BackupJob | None:
+    job = _jobs.get(job_id)
+    return job if job is not None and job.tenant == current_tenant.get() else None
+
+
+def start_backup(destination: str | None = None, method: str = "backup") -> BackupJob:
+    job = new_job(destination, method)
+    threading.Thread(target=run_backup, args=(job,), name=f"backup-{job.id}", daemon=True).start()
+    return job
+
+
+def run_backup(
+    job: BackupJob,
+    pages: int = BACKUP_PAGES_PER_STEP,
+    sleep_ms: int = BACKUP_STEP_SLEEP_MS,
+) -> BackupJob:
+    """Write a consistent snapshot of the tenant database and its archive while the app
+    keeps serving writes.
+
+    ``backup`` copies ``pages`` pages per step through the SQLite online backup API and
+    sleeps between steps, so writers only wait for a single step at a time. SQLite
+    restarts the copy whenever another connection commits in between; after
+    ``BACKUP_MAX_RESTARTS`` restarts the remainder is copied in one step, which holds
+    the read lock (and makes writers wait) for that final pass only.
+    ``vacuum`` uses ``VACUUM INTO`` for a compacted copy of the (WAL mode) database from
+    one read transaction; the archive is always copied in steps.
+    The database is copied before the archive, so a term archived in between ends up in
+    both snapshots rather than in neither. Each snapshot is written to a temp file,
+    checked with ``PRAGMA integrity_check`` and only moved into place once both pass.
+    """
+    started = time.monotonic()
+    job.status = "running"
+    os.makedirs(os.path.dirname(job.destination), exist_ok=True)
+    partials = [f"{snapshot.destination}.partial" for snapshot in job.files]
+    for tmp_path in partials:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    try:
+        for snapshot, tmp_path in zip(job.files, partials):
+            method = job.method if snapshot is job.files[0] else "backup"
+            _copy(snapshot, tmp_path, method, pages, sleep_ms)
+        job.status = "verifying"
+        for snapshot, tmp_path in zip(job.files, partials):
+            snapshot.integrity = verify_snapshot(tmp_path)
+        failed = [f"{os.path.basename(s.destination)}: {s.integrity}" for s in job.files if s.integrity != "ok"]
+        job.integrity = "; ".join(failed) or "ok"
+        if failed:
+            raise RuntimeError(f"integrity_check failed: {job.integrity}")
+        for snapshot, tmp_path in zip(job.files, partials):
+            os.replace(tmp_path, snapshot.destination)
+        job.status = "done"
+        metrics.inc("backups_completed", tenant=job.tenant)
+    except Exception as exc:
+        job.status = "failed"
+        job.error = str(exc)
+        metrics.inc("backups_failed", tenant=job.tenant)
+        for tmp_path in partials:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+    finally:
+        job.duration_seconds = round(time.monotonic() - started, 3)
+        metrics.observe("backup_duration_seconds", job.duration_seconds)
+    return job
+
+
+def _copy(snapshot: SnapshotFile, tmp_path: str, method: str, pages: int, sleep_ms: int) -> None:
+    source = sqlite3.connect(snapshot.source)
+    try:
+        if method == "vacuum":
+            snapshot.pages_total = source.execute("PRAGMA page_count").fetchone()[0]
+            source.execute("VACUUM INTO ?", (tmp_path,))
+            snapshot.pages_done = snapshot.pages_total
+            return
+        target = sqlite3.connect(tmp_path)
+        try:
+            try:
+                source.backup(target, pages=pages, progress=_progress(snapshot), sleep=sleep_ms / 1000)
+            except _TooManyRestarts:
+                source.backup(target, pages=-1)
+                snapshot.pages_done = snapshot.pages_total
+            # Pages copied from a WAL database keep its mode; a snapshot should be one file.
+            target.execute("PRAGMA journal_mode = DELETE")
+        finally:
+            target.close()
+    finally:
+        source.close()
+
+
+class _TooManyRestarts(Exception):
+    pass
+
+
+def _progress(snapshot: SnapshotFile):
+    def callback(status, remaining, total):
+        done = total - remaining
+        if done < snapshot.pages_done:
+            snapshot.restarts += 1
+            metrics.inc("backup_restarts")
+        snapshot.pages_total = total
+        snapshot.pages_done = done
+        if snapshot.restarts >= BACKUP_MAX_RESTARTS:
+            raise _TooManyRestarts
+
+    return callback
+
+
+def _journal_mode(path: str) -> str:
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("PRAGMA journal_mode").fetchone()[0].lower()
+    finally:
+        conn.close()
+
+
+def verify_snapshot(path: str) -> str:
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        rows = conn.execute("PRAGMA integrity_check").fetchall()
+    finally:
+        conn.close()
+    return "; ".join(r[0] for r in rows)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Snapshot the database while the app is running.")
+    parser.add_argument("--tenant", help="school tenant to back up (default: the default tenant)")
+    parser.add_argument("--dest", help=f"snapshot path (default: {BACKUP_DIR}/<tenant>/<timestamp>-<random>.db)")
+    parser.add_argument("--method", choices=["backup", "vacuum"], default="backup")
+    parser.add_argument("--pages", type=int, default=BACKUP_PAGES_PER_STEP, help="pages copied per step")
+    parser.add_argument("--sleep-ms", type=int, default=BACKUP_STEP_SLEEP_MS, help="pause between steps")
+    args = parser.parse_args(argv)
+
+    if args.tenant:
+        current_tenant.set(args.tenant)
+    if not tenants.exists(current_tenant.get()):
+        print(f"unknown tenant: {current_tenant.get()}")
+        return 1
+    try:
+        job = new_job(args.dest, args.method)
+    except FileExistsError as exc:
+        print(f"refusing to overwrite {exc}")
+        return 1
+    except ValueError as exc:
+        print(exc)
+        return 1
+    worker = threading.Thread(target=run_backup, args=(job, args.pages, args.sleep_ms))
+    worker.start()
+    while worker.is_alive():
+        worker.join(0.5)
+        print(f"\r{job.status:<10} {job.pages_done}/{job.pages_total} pages ({job.progress:.0%})", end="", flush=True)
+    print()
+    if job.status != "done":
+        print(f"backup failed after {job.duration_seconds}s: {job.error}")
+        return 1
+    for snapshot in job.files:
+        print(f"snapshot {snapshot.destination}: {snapshot.pages_total} pages, integrity_check: {snapshot.integrity}")
+    print(f"written in {job.duration_seconds}s")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,92 @@
+"""Microbenchmark for the per-request ORM overhead of the hot read paths.
+
+    python -m app.bench --iterations 5000
+
+Each iteration mimics one authenticated read request: open a session, look up the
+user, list a session's attendance and a course's assessments, and close. ``baseline``
+rebuilds ``select()`` constructs on a read-write ``SessionLocal``; ``optimized`` uses
+``ReadSessionLocal`` and the prebuilt statements in ``crud``. Runs against a throwaway
+tenant that is deleted afterwards.
+"""
+from __future__ import annotations
+
+import argparse
+import time
+from datetime import date
+
+from sqlalchemy import select
+
+from . import crud, schemas
+from .database import ReadSessionLocal, SessionLocal, current_tenant
+from .models import Assessment, AttendanceStatus, User
+from .tenancy import scratch_tenant
+
+
+def _prepare() -> tuple[int, int]:
+    """Return (course_id, session_id) of a new course with a roster, attendance and assessments."""
+    with SessionLocal() as db:
+        course = crud.create_course(db, schemas.CourseCreate(name="Benchmark course"))
+        session = crud.create_session(db, course.id, schemas.SessionCreate(session_date=date(2025, 3, 2)))
+        records = []
+        for i in range(30):
+            student = crud.create_student(db, schemas.StudentCreate(full_name=f"Benchmark Student {i}"))
+            records.append(schemas.AttendanceInput(student_id=student.id, status=AttendanceStatus.present))
+        crud.upsert_attendance(db, session.id, records)
+        for name in ("Quiz", "Midterm", "Final"):
+            crud.create_assessment(db, course.id, schemas.AssessmentCreate(name=name, weight=1, max_score=100))
+        return course.id, session.id
+
+
+def _baseline(username: str, course_id: int, session_id: int) -> None:
+    with SessionLocal() as db:
+        db.scalars(select(User).where(User.username == username)).first()
+        list(db.scalars(crud.attendance_query(session_id)))
+        list(
+            db.scalars(
+                select(Assessment).where(Assessment.course_id == course_id).order_by(Assessment.created_at.desc())
+            )
+        )
+
+
+def _optimized(username: str, course_id: int, session_id: int) -> None:
+    with ReadSessionLocal() as db:
+        crud.get_user_by_username(db, username)
+        crud.list_attendance(db, session_id)
+        crud.list_assessments(db, course_id)
+
+
+def _measure(fn, iterations: int, *args, rounds: int = 3) -> float:
+    """Best-of-``rounds`` microseconds per call, after a short warm-up."""
+    for _ in range(min(200, iterations)):
+        fn(*args)
+    best = float("inf")
+    for _ in range(rounds):
+        started = time.perf_counter()
+        for _ in range(iterations):
+            fn(*args)
+        best = min(best, time.perf_counter() - started)
+    return best / iterations * 1e6
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Compare hot read paths before/after the read-only session.")
+    parser.add_argument("--iterations", type=int, default=3000)
+    args = parser.parse_args(argv)
+
+    with scratch_tenant("bench") as (tenant, credentials):
+        token = current_tenant.set(tenant.name)
+        try:
+            course_id, session_id = _prepare()
+            lookup = (credentials["username"], course_id, session_id)
+            baseline = _measure(_baseline, args.iterations, *lookup)
+            optimized = _measure(_optimized, args.iterations, *lookup)
+        finally:
+            current_tenant.reset(token)
+    print(f"baseline  (SessionLocal + select())          {baseline:8.1f} us/request")
+    print(f"optimized (ReadSessionLocal + prebuilt)      {optimized:8.1f} us/request")
+    print(f"saved {baseline - optimized:.1f} us/request ({1 - optimized / baseline:.1%})")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+import threading
+from typing import Any, Callable
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from .database import current_tenant
+
+_lock = threading.Lock()
+_entries: dict[tuple[str, str], tuple[int, Any]] = {}
+
+# Every committed write to a synced table appends to change_log (see changelog.py), and its
+# AUTOINCREMENT sequence never goes back, so the sequence is a data version shared by all
+# workers and CLI tools writing the same file.
+_DATA_VERSION = text("SELECT seq FROM sqlite_sequence WHERE name = 'change_log'")
+
+
+def data_version(db: Session) -> int:
+    return db.execute(_DATA_VERSION).scalar() or 0
+
+
+def etag(version: int) -> str:
+    # The tenant keeps one school's tag from validating another's response.
+    return f'W/"{current_tenant.get()}-{version}"'
+
+
+def cached(name: str, version: int, build: Callable[[], Any]) -> Any:
+    """Return the value built for ``version``, rebuilding it once the data has moved on."""
+    tenant = current_tenant.get()
+    hit = _entries.get((tenant, name))
+    if hit is not None and hit[0] == version:
+        return hit[1]
+    value = build()
+    with _lock:
+        current = _entries.get((tenant, name))
+        if current is None or current[0] <= version:
+            _entries[(tenant, name)] = (version, value)
+    return value
@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+from decimal import Decimal
+
+from sqlalchemy import event, func, insert, select, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from .models import (
+    Assessment,
+    AttendanceRecord,
+    ChangeLog,
+    Course,
+    Enrollment,
+    Score,
+    Session as CourseSession,
+    Student,
+)
+
+# Tables exposed through /sync, in the order a client should apply a full load.
+SYNCED_MODELS = {
+    "students": Student,
+    "courses": Course,
+    "enrollments": Enrollment,
+    "sessions": CourseSession,
+    "assessments": Assessment,
+    "attendance_records": AttendanceRecord,
+    "scores": Score,
+}
+_TABLE_BY_MODEL = {model: table for table, model in SYNCED_MODELS.items()}
+
+
+@event.listens_for(Session, "after_flush")
+def _record_changes(session: Session, flush_context) -> None:
+    # new/dirty/deleted still describe what this flush wrote; ids are assigned by now.
+    entries = []
+    for obj in session.new:
+        table = _TABLE_BY_MODEL.get(type(obj))
+        if table:
+            entries.append({"table_name": table, "row_id": obj.id, "op": "upsert"})
+    for obj in session.dirty:
+        table = _TABLE_BY_MODEL.get(type(obj))
+        if table and session.is_modified(obj, include_collections=False):
+            entries.append({"table_name": table, "row_id": obj.id, "op": "upsert"})
+    for obj in session.deleted:
+        table = _TABLE_BY_MODEL.get(type(obj))
+        if table:
+            entries.append({"table_name": table, "row_id": obj.id, "op": "delete"})
+    if entries:
+        session.connection().execute(insert(ChangeLog), entries)
+
+
+def backfill_change_log(bind: Engine) -> None:
+    """Seed the log with every existing row once, so cursor 0 means a full load."""
+    with bind.begin() as conn:
+        if conn.execute(select(func.count(ChangeLog.id))).scalar():
+            return
+        for table in SYNCED_MODELS:
+            conn.execute(
+                text(
+                    f"INSERT INTO change_log (table_name, row_id, op, changed_at) "
+                    f"SELECT '{table}', id, 'upsert', CURRENT_TIMESTAMP FROM {table} ORDER BY id"
+                )
+            )
+
+
+def changes_since(db: Session, cursor: int, limit: int = 500) -> dict:
+    entries = db.scalars(
+        select(ChangeLog).where(ChangeLog.id > cursor).order_by(ChangeLog.id).limit(limit + 1)
+    ).all()
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+
+    # Collapse repeated changes to the same row within the page; the last one wins.
+    latest: dict[tuple[str, int], ChangeLog] = {}
+    for entry in entries:
+        key = (entry.table_name, entry.row_id)
+        latest.pop(key, None)
+        latest[key] = entry
+
+    wanted: dict[str, list[int]] = {}
+    for entry in latest.values():
+        if entry.op == "upsert":
+            wanted.setdefault(entry.table_name, []).append(entry.row_id)
+    rows: dict[str, dict[int, dict]] = {}
+    for table, ids in wanted.items():
+        model = SYNCED_MODELS[table]
+        columns = [c.key for c in model.__mapper__.column_attrs]
+        rows[table] = {
+            obj.id: {name: _plain(getattr(obj, name)) for name in columns}
+            for obj in db.scalars(select(model).where(model.id.in_(ids)))
+        }
+
+    changes = []
+    for entry in latest.values():
+        data = rows.get(entry.table_name, {}).get(entry.row_id) if entry.op == "upsert" else None
+        changes.append(
+            {
+                "cursor": entry.id,
+                "table": entry.table_name,
+                "id": entry.row_id,
+                # A row deleted after this page's upsert is reported as deleted right away.
+                "op": "upsert" if data is not None else "delete",
+                "data": data,
+            }
+        )
+    return {
+        "cursor": entries[-1].id if entries else cursor,
+        "has_more": has_more,
+        "changes": changes,
+    }
+
+
+def _plain(value):
+    # Numeric score columns load as Decimal; send floats like ScoreRead does, not "92.00".
+    return float(value) if isinstance(value, Decimal) else value
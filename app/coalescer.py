@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Any, Callable
+
+from sqlalchemy.orm import Session
+
+from .config import COALESCE_MAX_BATCH, COALESCE_MAX_WAIT_MS
+from .database import SessionLocal, current_tenant
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _Job:
+    stage: Callable[..., Any]
+    args: tuple
+    after_commit: Callable[[Session, Any], None] | None
+    future: Future = field(default_factory=Future)
+    enqueued_at: float = field(default_factory=time.monotonic)
+    tenant: str = field(default_factory=current_tenant.get)
+
+
+class WriteCoalescer:
+    """Group commit for write requests.
+
+    Callers hand over a *stage* function that applies their changes to a session
+    without committing. A single worker thread drains whatever is queued (waiting
+    at most ``max_wait`` for stragglers), stages every job in one transaction and
+    commits once. If the shared transaction fails, each job is retried on its own
+    so that every caller gets its own result or error. Jobs are committed per tenant,
+    with the submitting request's tenant made current while ``session_factory`` runs.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        max_batch: int = COALESCE_MAX_BATCH,
+        max_wait: float = COALESCE_MAX_WAIT_MS / 1000,
+    ):
+        self._session_factory = session_factory
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._queue: queue.Queue[_Job] = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+
+    def submit(self, stage: Callable[..., Any], *args, after_commit=None) -> Future:
+        job = _Job(stage=stage, args=args, after_commit=after_commit)
+        self._ensure_worker()
+        self._queue.put(job)
+        metrics.set_gauge("coalescer_queue_depth", self._queue.qsize())
+        return job.future
+
+    def run(self, stage: Callable[..., Any], *args, after_commit=None) -> Any:
+        return self.submit(stage, *args, after_commit=after_commit).result()
+
+    def _ensure_worker(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._loop, name="write-coalescer", daemon=True)
+                self._thread.start()
+
+    def _loop(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self._queue.get_nowait())
+                    continue
+                except queue.Empty:
+                    pass
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            metrics.set_gauge("coalescer_queue_depth", self._queue.qsize())
+            metrics.observe("coalescer_batch_size", len(batch))
+            started = time.monotonic()
+            for job in batch:
+                metrics.observe("coalescer_queue_wait_ms", (started - job.enqueued_at) * 1000)
+            by_tenant: dict[str, list[_Job]] = {}
+            for job in batch:
+                by_tenant.setdefault(job.tenant, []).append(job)
+            for tenant, jobs in by_tenant.items():
+                token = current_tenant.set(tenant)
+                try:
+                    self._execute(jobs)
+                except Exception as exc:  # never let the worker die with callers waiting
+                    logger.exception("write coalescer batch failed")
+                    for job in jobs:
+                        if not job.future.done():
+                            job.future.set_exception(exc)
+                finally:
+                    current_tenant.reset(token)
+            metrics.observe("coalescer_batch_ms", (time.monotonic() - started) * 1000)
+
+    def _execute(self, batch: list[_Job]) -> None:
+        with self._session_factory() as db:
+            try:
+                results = []
+                for job in batch:
+                    results.append(job.stage(db, *job.args))
+                    db.flush()
+                db.commit()
+            except Exception as exc:
+                db.rollback()
+                if len(batch) == 1:
+                    batch[0].future.set_exception(exc)
+                    return
+                metrics.inc("coalescer_batch_fallbacks")
+                for job in batch:
+                    self._execute([job])
+                return
+            for job, result in zip(batch, results):
+                for obj in _as_list(result):
+                    db.refresh(obj)
+                if job.after_commit is not None:
+                    try:
+                        job.after_commit(db, result)
+                    except Exception:
+                        logger.exception("write coalescer after_commit hook failed")
+            db.expunge_all()
+        metrics.inc("coalescer_commits")
+        metrics.inc("coalescer_jobs", len(batch))
+        for job, result in zip(batch, results):
+            job.future.set_result(result)
+
+
+def _as_list(result: Any) -> list:
+    if result is None:
+        return []
+    if isinstance(result, list):
+        return result
+    return [result]
+
+
+write_coalescer = WriteCoalescer(SessionLocal)
@@ -7,3 +7,55 @@ SECRET_KEY = os.getenv("SECRET_KEY", "super-secret-key-change-me")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "60"))
 ACCESS_TOKEN_EXPIRE = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+
+# Live attendance events (SSE)
+EVENT_HISTORY_SIZE = int(os.getenv("EVENT_HISTORY_SIZE", "500"))
+EVENT_KEEPALIVE_SECONDS = float(os.getenv("EVENT_KEEPALIVE_SECONDS", "15"))
+EVENT_SUBSCRIBER_QUEUE_SIZE = int(os.getenv("EVENT_SUBSCRIBER_QUEUE_SIZE", "1000"))
+
+# Write coalescing for bulk attendance/score submissions
+WRITE_COALESCING = os.getenv("WRITE_COALESCING", "1") == "1"
+COALESCE_MAX_BATCH = int(os.getenv("COALESCE_MAX_BATCH", "32"))
+COALESCE_MAX_WAIT_MS = float(os.getenv("COALESCE_MAX_WAIT_MS", "2"))
+
+# Idempotency-Key support for bulk writes
+IDEMPOTENCY_TTL_SECONDS = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", "86400"))
+IDEMPOTENCY_MAX_KEYS = int(os.getenv("IDEMPOTENCY_MAX_KEYS", "10000"))
+
+# Admission control (per cost class / per route concurrency)
+ADMISSION_TOTAL_LIMIT = int(os.getenv("ADMISSION_TOTAL_LIMIT", "32"))
+ADMISSION_INTERACTIVE_RESERVED = int(os.getenv("ADMISSION_INTERACTIVE_RESERVED", "8"))
+ADMISSION_REPORT_LIMIT = int(os.getenv("ADMISSION_REPORT_LIMIT", "4"))
+ADMISSION_QUEUE_TIMEOUT_SECONDS = float(os.getenv("ADMISSION_QUEUE_TIMEOUT_SECONDS", "5"))
+ADMISSION_RETRY_AFTER_SECONDS = int(os.getenv("ADMISSION_RETRY_AFTER_SECONDS", "2"))
+
+# Streaming list responses (?stream=json|ndjson)
+STREAM_BATCH_SIZE = int(os.getenv("STREAM_BATCH_SIZE", "500"))
+
+# Cold storage for closed terms
+ARCHIVE_DATABASE_PATH = os.getenv("ARCHIVE_DATABASE_PATH", "./archive.db")
+
+# Online backups
+BACKUP_DIR = os.getenv("BACKUP_DIR", "./backups")
+BACKUP_PAGES_PER_STEP = int(os.getenv("BACKUP_PAGES_PER_STEP", "256"))
+BACKUP_STEP_SLEEP_MS = int(os.getenv("BACKUP_STEP_SLEEP_MS", "10"))
+BACKUP_MAX_RESTARTS = int(os.getenv("BACKUP_MAX_RESTARTS", "3"))
+
+# SQLite connections: how long a writer waits for a lock before "database is locked"
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+
+# Read-only connection pool (pure reads and auth lookups)
+READ_POOL_SIZE = int(os.getenv("READ_POOL_SIZE", "32"))
+
+# Batch report cards
+REPORT_WORKERS = int(os.getenv("REPORT_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+# Multi-school tenancy: one SQLite file per tenant behind an LRU engine cache
+DEFAULT_TENANT = os.getenv("DEFAULT_TENANT", "default")
+TENANT_DATA_DIR = os.getenv("TENANT_DATA_DIR", "./tenants")
+TENANT_HEADER = os.getenv("TENANT_HEADER", "X-Tenant")
+TENANT_HOST_SUFFIX = os.getenv("TENANT_HOST_SUFFIX", "")  # e.g. ".schools.example.com"
+# Off by default: any valid name would open a new school. Auto-created schools start with no accounts.
+TENANT_AUTO_CREATE = os.getenv("TENANT_AUTO_CREATE", "0") == "1"
+TENANT_CACHE_SIZE = int(os.getenv("TENANT_CACHE_SIZE", "32"))
+TENANT_IDLE_SECONDS = float(os.getenv("TENANT_IDLE_SECONDS", "600"))
@@ -2,8 +2,9 @@ from __future__ import annotations
 
 from typing import Iterable, List
 
-from sqlalchemy import select
-from sqlalchemy.orm import Session
+from sqlalchemy import bindparam, func, select
+from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.sql import Select
 
 from .models import (
     Assessment,
@@ -16,9 +17,13 @@ from .models import (
     Student,
     User,
 )
+from . import search
+from .events import broker
 from .schemas import (
+  AssessmentChange,
   AssessmentCreate,
   AttendanceInput,
+  AttendanceRead,
   CourseCreate,
   ScoreInput,
   SessionCreate,
@@ -31,13 +36,19 @@ from .security import get_password_hash, verify_password
 def create_student(db: Session, payload: StudentCreate) -> Student:
     student = Student(**payload.dict())
     db.add(student)
+    db.flush()
+    search.index_student(db, student)
     db.commit()
     db.refresh(student)
     return student
 
 
+def students_query() -> Select:
+  return select(Student).order_by(Student.created_at.desc())
+
+
 def list_students(db: Session) -> List[Student]:
-  return list(db.scalars(select(Student).order_by(Student.created_at.desc())))
+  return list(db.scalars(students_query()))
 
 
 def update_student(db: Session, student_id: int, payload: StudentCreate) -> Student | None:
@@ -46,6 +57,7 @@ def update_student(db: Session, student_id: int, payload: StudentCreate) -> Stud
     return None
   for key, value in payload.dict().items():
     setattr(student, key, value)
+  search.index_student(db, student)
   db.commit()
   db.refresh(student)
   return student
@@ -56,6 +68,7 @@ def delete_student(db: Session, student_id: int) -> bool:
   if not student:
     return False
   db.delete(student)
+  search.remove_student(db, student_id)
   db.commit()
   return True
 
@@ -63,13 +76,19 @@ def delete_student(db: Session, student_id: int) -> bool:
 def create_course(db: Session, payload: CourseCreate) -> Course:
   course = Course(**payload.dict())
   db.add(course)
+  db.flush()
+  search.index_course(db, course)
   db.commit()
   db.refresh(course)
   return course
 
 
+def courses_query() -> Select:
+  return select(Course).order_by(Course.created_at.desc())
+
+
 def list_courses(db: Session) -> List[Course]:
-  return list(db.scalars(select(Course).order_by(Course.created_at.desc())))
+  return list(db.scalars(courses_query()))
 
 
 def update_course(db: Session, course_id: int, payload: CourseCreate) -> Course | None:
@@ -78,6 +97,7 @@ def update_course(db: Session, course_id: int, payload: CourseCreate) -> Course
     return None
   for key, value in payload.dict().items():
     setattr(course, key, value)
+  search.index_course(db, course)
   db.commit()
   db.refresh(course)
   return course
@@ -88,6 +108,7 @@ def delete_course(db: Session, course_id: int) -> bool:
   if not course:
     return False
   db.delete(course)
+  search.remove_course(db, course_id)
   db.commit()
   return True
 
@@ -100,13 +121,17 @@ def enroll_student(db: Session, course_id: int, student_id: int) -> Enrollment:
   return enrollment
 
 
-def list_enrollments(db: Session, course_id: int) -> List[Enrollment]:
-    stmt = (
+def enrollments_query(course_id: int) -> Select:
+    return (
         select(Enrollment)
+        .options(joinedload(Enrollment.student))
         .where(Enrollment.course_id == course_id)
         .order_by(Enrollment.created_at.desc())
     )
-    return list(db.scalars(stmt))
+
+
+def list_enrollments(db: Session, course_id: int) -> List[Enrollment]:
+    return list(db.scalars(enrollments_query(course_id)))
 
 
 def create_session(db: Session, course_id: int, payload: SessionCreate) -> CourseSession:
@@ -117,17 +142,31 @@ def create_session(db: Session, course_id: int, payload: SessionCreate) -> Cours
     return session
 
 
-def list_sessions(db: Session, course_id: int) -> List[CourseSession]:
-    stmt = (
+def sessions_query(course_id: int) -> Select:
+    return (
         select(CourseSession)
         .where(CourseSession.course_id == course_id)
         .order_by(CourseSession.session_date.desc())
     )
-    return list(db.scalars(stmt))
+
+
+def list_sessions(db: Session, course_id: int) -> List[CourseSession]:
+    return list(db.scalars(sessions_query(course_id)))
 
 
 def upsert_attendance(
     db: Session, session_id: int, items: Iterable[AttendanceInput]
+) -> List[AttendanceRecord]:
+    updated = stage_attendance(db, session_id, items)
+    db.commit()
+    for record in updated:
+        db.refresh(record)
+    publish_attendance(db, session_id, updated)
+    return updated
+
+
+def stage_attendance(
+    db: Session, session_id: int, items: Iterable[AttendanceInput]
 ) -> List[AttendanceRecord]:
     updated: list[AttendanceRecord] = []
     for item in items:
@@ -149,19 +188,42 @@ def upsert_attendance(
             )
             db.add(record)
             updated.append(record)
-    db.commit()
-    for record in updated:
-        db.refresh(record)
     return updated
 
 
-def list_attendance(db: Session, session_id: int) -> List[AttendanceRecord]:
-    stmt = (
+def publish_attendance(db: Session, session_id: int, records: List[AttendanceRecord]) -> None:
+    if not records:
+        return
+    session = db.get(CourseSession, session_id)
+    topics = [f"session:{session_id}"]
+    if session:
+        topics.append(f"course:{session.course_id}")
+    broker.publish(
+        topics,
+        "attendance",
+        {
+            "session_id": session_id,
+            "course_id": session.course_id if session else None,
+            "records": [AttendanceRead.model_validate(r).model_dump(mode="json") for r in records],
+        },
+    )
+
+
+def attendance_query(session_id: int) -> Select:
+    return (
         select(AttendanceRecord)
         .where(AttendanceRecord.session_id == session_id)
         .order_by(AttendanceRecord.student_id.asc())
     )
-    return list(db.scalars(stmt))
+
+
+# Hot read statements are built once and only re-bound per call, which skips
+# statement construction and cache-key generation on every request.
+_ATTENDANCE_BY_SESSION = attendance_query(bindparam("session_id"))
+
+
+def list_attendance(db: Session, session_id: int) -> List[AttendanceRecord]:
+    return list(db.scalars(_ATTENDANCE_BY_SESSION, {"session_id": session_id}))
 
 
 def attendance_summary_by_course(db: Session, course_id: int):
@@ -195,17 +257,29 @@ def create_assessment(db: Session, course_id: int, payload: AssessmentCreate) ->
     return assessment
 
 
+_ASSESSMENTS_BY_COURSE = (
+    select(Assessment)
+    .where(Assessment.course_id == bindparam("course_id"))
+    .order_by(Assessment.created_at.desc())
+)
+
+
 def list_assessments(db: Session, course_id: int) -> List[Assessment]:
-    stmt = (
-        select(Assessment)
-        .where(Assessment.course_id == course_id)
-        .order_by(Assessment.created_at.desc())
-    )
-    return list(db.scalars(stmt))
+    return list(db.scalars(_ASSESSMENTS_BY_COURSE, {"course_id": course_id}))
 
 
 def upsert_scores(
     db: Session, assessment_id: int, items: Iterable[ScoreInput]
+) -> List[Score]:
+    updated = stage_scores(db, assessment_id, items)
+    db.commit()
+    for record in updated:
+        db.refresh(record)
+    return updated
+
+
+def stage_scores(
+    db: Session, assessment_id: int, items: Iterable[ScoreInput]
 ) -> List[Score]:
     updated: list[Score] = []
     for item in items:
@@ -226,12 +300,15 @@ def upsert_scores(
             )
             db.add(score)
             updated.append(score)
-    db.commit()
-    for record in updated:
-        db.refresh(record)
     return updated
 
 
+def score_points(raw_score: float, adjusted_score: float | None, max_score: float, weight: float) -> float:
+    """Weighted points one score contributes to a course total (adjusted score wins)."""
+    base = float(adjusted_score or raw_score)
+    return (base / max_score) * weight * 100
+
+
 def grade_summary_for_student(db: Session, student_id: int):
     courses = select(Course).join(Enrollment).where(Enrollment.student_id == student_id)
     results = []
@@ -250,8 +327,7 @@ def grade_summary_for_student(db: Session, student_id: int):
             ).first()
             if score:
                 detail_scores.append(score)
-                base = float(score.adjusted_score or score.raw_score)
-                course_weighted += (base / assessment.max_score) * assessment.weight * 100
+                course_weighted += score_points(score.raw_score, score.adjusted_score, assessment.max_score, assessment.weight)
         results.append(
             {
                 "course_id": course.id,
@@ -284,9 +360,168 @@ def grade_summary_for_course(db: Session, course_id: int):
     }
 
 
+def what_if_grades(db: Session, course_id: int, changes: dict[int, AssessmentChange]):
+    """Old and new weighted score and rank of every enrolled student under proposed
+    assessment weights/max scores, without writing anything.
+
+    The course's scores are loaded once; each score then adds its old and new points
+    in the same pass. Ranks are competition ranks (1, 2, 2, 4) by descending score.
+    """
+    course = db.get(Course, course_id)
+    if not course:
+        return None
+    assessments = db.execute(
+        select(Assessment.id, Assessment.name, Assessment.weight, Assessment.max_score)
+        .where(Assessment.course_id == course_id)
+        .order_by(Assessment.id)
+    ).all()
+    proposed = {}
+    for a in assessments:
+        change = changes.get(a.id)
+        weight = change.weight if change and change.weight is not None else a.weight
+        max_score = change.max_score if change and change.max_score is not None else a.max_score
+        proposed[a.id] = (weight, max_score)
+    students = db.execute(
+        select(Student.id, Student.full_name)
+        .join(Enrollment, Enrollment.student_id == Student.id)
+        .where(Enrollment.course_id == course_id)
+    ).all()
+    old = {s.id: 0.0 for s in students}
+    new = dict(old)
+    current = {a.id: (a.weight, a.max_score) for a in assessments}
+    for student_id, assessment_id, raw_score, adjusted_score in db.execute(
+        select(Score.student_id, Score.assessment_id, Score.raw_score, Score.adjusted_score)
+        .join(Assessment, Assessment.id == Score.assessment_id)
+        .where(Assessment.course_id == course_id)
+    ):
+        if student_id not in old:
+            continue
+        weight, max_score = current[assessment_id]
+        old[student_id] += score_points(raw_score, adjusted_score, max_score, weight)
+        weight, max_score = proposed[assessment_id]
+        new[student_id] += score_points(raw_score, adjusted_score, max_score, weight)
+
+    old = {k: round(v, 2) for k, v in old.items()}
+    new = {k: round(v, 2) for k, v in new.items()}
+    old_rank, new_rank = _competition_rank(old), _competition_rank(new)
+    results = [
+        {
+            "student_id": s.id,
+            "full_name": s.full_name,
+            "old_score": old[s.id],
+            "new_score": new[s.id],
+            "delta": round(new[s.id] - old[s.id], 2),
+            "old_rank": old_rank[s.id],
+            "new_rank": new_rank[s.id],
+            "rank_change": old_rank[s.id] - new_rank[s.id],
+        }
+        for s in students
+    ]
+    results.sort(key=lambda r: (r["new_rank"], r["full_name"], r["student_id"]))
+    return {
+        "course_id": course.id,
+        "course_name": course.name,
+        "old_total_weight": float(sum(a.weight for a in assessments) or 1),
+        "new_total_weight": float(sum(w for w, _ in proposed.values()) or 1),
+        "assessments": [
+            {
+                "assessment_id": a.id,
+                "name": a.name,
+                "old_weight": a.weight,
+                "new_weight": proposed[a.id][0],
+                "old_max_score": a.max_score,
+                "new_max_score": proposed[a.id][1],
+            }
+            for a in assessments
+        ],
+        "students": results,
+    }
+
+
+def _competition_rank(scores: dict[int, float]) -> dict[int, int]:
+    ranks: dict[int, int] = {}
+    previous = None
+    for position, (student_id, score) in enumerate(sorted(scores.items(), key=lambda item: -item[1]), start=1):
+        if score != previous:
+            rank, previous = position, score
+        ranks[student_id] = rank
+    return ranks
+
+
+def dashboard_snapshot(db: Session, recent_limit: int = 10):
+    counts = {
+        "students": db.scalar(select(func.count(Student.id))),
+        "courses": db.scalar(select(func.count(Course.id))),
+        "sessions": db.scalar(select(func.count(CourseSession.id))),
+        "assessments": db.scalar(select(func.count(Assessment.id))),
+    }
+    recent_sessions = db.execute(
+        select(
+            CourseSession.id,
+            CourseSession.course_id,
+            Course.name.label("course_name"),
+            CourseSession.session_date,
+            CourseSession.topic,
+        )
+        .join(Course, Course.id == CourseSession.course_id)
+        .order_by(CourseSession.session_date.desc(), CourseSession.id.desc())
+        .limit(recent_limit)
+    ).mappings().all()
+
+    courses = db.execute(
+        select(Course.id, Course.name, Course.teacher_name).order_by(Course.created_at.desc())
+    ).all()
+    stats = {
+        c.id: {
+            "course_id": c.id,
+            "course_name": c.name,
+            "session_count": 0,
+            **{s.value: 0 for s in AttendanceStatus},
+            "average_score": None,
+        }
+        for c in courses
+    }
+    session_counts = db.execute(
+        select(CourseSession.course_id, func.count(CourseSession.id)).group_by(CourseSession.course_id)
+    )
+    for course_id, count in session_counts:
+        if course_id in stats:
+            stats[course_id]["session_count"] = count
+    status_counts = db.execute(
+        select(CourseSession.course_id, AttendanceRecord.status, func.count(AttendanceRecord.id))
+        .join(AttendanceRecord, AttendanceRecord.session_id == CourseSession.id)
+        .group_by(CourseSession.course_id, AttendanceRecord.status)
+    )
+    for course_id, status, count in status_counts:
+        if course_id in stats:
+            stats[course_id][status.value] = count
+    averages = db.execute(
+        select(Assessment.course_id, func.avg(Score.raw_score))
+        .join(Score, Score.assessment_id == Assessment.id)
+        .group_by(Assessment.course_id)
+    )
+    for course_id, average in averages:
+        if course_id in stats and average is not None:
+            stats[course_id]["average_score"] = round(float(average), 2)
+
+    students = db.execute(
+        select(Student.id, Student.full_name, Student.email).order_by(Student.created_at.desc())
+    ).all()
+    return {
+        "counts": counts,
+        "recent_sessions": recent_sessions,
+        "course_stats": list(stats.values()),
+        "students": [{"id": s.id, "name": s.full_name, "detail": s.email} for s in students],
+        "courses": [{"id": c.id, "name": c.name, "detail": c.teacher_name} for c in courses],
+    }
+
+
 # Auth / User
+_USER_BY_USERNAME = select(User).where(User.username == bindparam("username"))
+
+
 def get_user_by_username(db: Session, username: str) -> User | None:
-    return db.scalars(select(User).where(User.username == username)).first()
+    return db.scalars(_USER_BY_USERNAME, {"username": username}).first()
 
 
 def create_user(db: Session, payload: UserCreate) -> User:
@@ -1,14 +1,207 @@
-from sqlalchemy import create_engine
+from __future__ import annotations
+
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from contextvars import ContextVar
+from typing import Callable
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker, declarative_base
 
+from .config import (
+    ARCHIVE_DATABASE_PATH,
+    DEFAULT_TENANT,
+    READ_POOL_SIZE,
+    SQLITE_BUSY_TIMEOUT_MS,
+    TENANT_AUTO_CREATE,
+    TENANT_CACHE_SIZE,
+    TENANT_DATA_DIR,
+    TENANT_IDLE_SECONDS,
+)
+from .metrics import metrics
+
+# The default tenant keeps the original single-school files.
 DATABASE_URL = "sqlite:///./app.db"
 
-engine = create_engine(
-    DATABASE_URL, connect_args={"check_same_thread": False}
-)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+# Set per request by TenantMiddleware (and by the write coalescer per batch).
+current_tenant: ContextVar[str] = ContextVar("current_tenant", default=DEFAULT_TENANT)
+
+TENANT_NAME = re.compile(r"^[a-z0-9][a-z0-9_-]{0,62}$")
+
+
+class TenantDatabase:
+    """Engines and session factories for one tenant's database and archive files."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.path, self.archive_path = tenant_paths(name)
+        url = f"sqlite:///{self.path}"
+        self.engine = create_engine(url, connect_args={"check_same_thread": False})
+        event.listen(self.engine, "connect", _write_ahead_log)
+        self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
+        # Separate pool for pure reads: the connections refuse writes, and sessions skip
+        # autoflush and expire-on-commit bookkeeping since nothing is ever written through them.
+        self.read_engine = create_engine(url, connect_args={"check_same_thread": False}, pool_size=READ_POOL_SIZE)
+        event.listen(self.read_engine, "connect", _busy_timeout)
+        event.listen(self.read_engine, "connect", _query_only)
+        self.ReadSessionLocal = sessionmaker(
+            autocommit=False, autoflush=False, expire_on_commit=False, bind=self.read_engine
+        )
+        self.archive_engine = create_engine(
+            f"sqlite:///file:{self.archive_path}?mode=ro&uri=true",
+            connect_args={"check_same_thread": False},
+        )
+        self.ArchiveSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self.archive_engine)
+        self.last_used = time.monotonic()
+
+    def dispose(self) -> None:
+        for bind in (self.engine, self.read_engine, self.archive_engine):
+            bind.dispose()
+
+
+def tenant_paths(name: str) -> tuple[str, str]:
+    """(database, archive) file paths of a tenant."""
+    if name == DEFAULT_TENANT:
+        return os.path.abspath(make_url(DATABASE_URL).database), os.path.abspath(ARCHIVE_DATABASE_PATH)
+    return (
+        os.path.abspath(os.path.join(TENANT_DATA_DIR, f"{name}.db")),
+        os.path.abspath(os.path.join(TENANT_DATA_DIR, f"{name}.archive.db")),
+    )
+
+
+def _write_ahead_log(dbapi_connection, connection_record):
+    # WAL lets long readers (streamed lists, backups) run alongside writers instead of
+    # holding a SHARED lock that makes every commit wait. The mode is stored in the file.
+    dbapi_connection.execute("PRAGMA journal_mode = WAL")
+    _busy_timeout(dbapi_connection, connection_record)
+
+
+def _busy_timeout(dbapi_connection, connection_record):
+    dbapi_connection.execute(f"PRAGMA busy_timeout = {SQLITE_BUSY_TIMEOUT_MS}")
+
+
+def _query_only(dbapi_connection, connection_record):
+    dbapi_connection.execute("PRAGMA query_only = ON")
+
+
+class TenantRegistry:
+    """Bounded LRU of open tenant databases.
+
+    Opening a tenant runs the ``on_open`` hooks (schema, search index, seed data) once.
+    The least recently used tenant is disposed when more than ``max_open`` are open,
+    and tenants idle for ``idle_seconds`` are disposed on the next lookup.
+    """
+
+    def __init__(self, max_open: int = TENANT_CACHE_SIZE, idle_seconds: float = TENANT_IDLE_SECONDS):
+        self.max_open = max_open
+        self.idle_seconds = idle_seconds
+        self.on_open: list[Callable[[TenantDatabase], None]] = []
+        self._open: OrderedDict[str, TenantDatabase] = OrderedDict()
+        self._opening: dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self._next_idle_check = 0.0
+
+    def exists(self, name: str) -> bool:
+        if name == DEFAULT_TENANT or name in self._open:
+            return True
+        return bool(TENANT_NAME.match(name)) and os.path.exists(os.path.join(TENANT_DATA_DIR, f"{name}.db"))
+
+    def allowed(self, name: str) -> bool:
+        return self.exists(name) or (TENANT_AUTO_CREATE and bool(TENANT_NAME.match(name)))
+
+    def get(self, name: str) -> TenantDatabase:
+        now = time.monotonic()
+        with self._lock:
+            tenant = self._touch(name, now)
+            if tenant is not None:
+                return tenant
+            opening = self._opening.setdefault(name, threading.Lock())
+        # Open outside the registry lock so a cold tenant does not stall the others.
+        with opening:
+            with self._lock:
+                tenant = self._touch(name, now)
+                if tenant is not None:
+                    return tenant
+            if not TENANT_NAME.match(name):
+                raise ValueError(f"invalid tenant name: {name!r}")
+            if name != DEFAULT_TENANT:
+                os.makedirs(TENANT_DATA_DIR, exist_ok=True)
+            tenant = TenantDatabase(name)
+            try:
+                for hook in self.on_open:
+                    hook(tenant)
+            except Exception:
+                tenant.dispose()
+                with self._lock:
+                    self._opening.pop(name, None)
+                raise
+            with self._lock:
+                self._open[name] = tenant
+                self._opening.pop(name, None)
+                metrics.inc("tenant_databases_opened", tenant=name)
+                while len(self._open) > self.max_open:
+                    self._evict(next(iter(self._open)), "lru")
+                metrics.set_gauge("tenant_databases_open", len(self._open))
+        return tenant
+
+    def _touch(self, name: str, now: float) -> TenantDatabase | None:
+        tenant = self._open.get(name)
+        if now >= self._next_idle_check:
+            self._next_idle_check = now + min(self.idle_seconds / 4, 60)
+            for other in [t for t in self._open.values() if t.name != name and now - t.last_used > self.idle_seconds]:
+                self._evict(other.name, "idle")
+            metrics.set_gauge("tenant_databases_open", len(self._open))
+        if tenant is not None:
+            tenant.last_used = now
+            self._open.move_to_end(name)
+        return tenant
+
+    def _evict(self, name: str, reason: str) -> None:
+        # Requests still holding sessions keep working; their connections close on return.
+        tenant = self._open.pop(name)
+        tenant.dispose()
+        metrics.inc("tenant_databases_evicted", reason=reason)
+
+    def remove(self, name: str) -> None:
+        """Close a tenant and delete its files (used for throwaway benchmark tenants)."""
+        if name == DEFAULT_TENANT:
+            raise ValueError("the default tenant cannot be removed")
+        with self._lock:
+            if name in self._open:
+                self._evict(name, "removed")
+                metrics.set_gauge("tenant_databases_open", len(self._open))
+        for path in tenant_paths(name):
+            for suffix in ("", "-wal", "-shm", "-journal"):
+                if os.path.exists(path + suffix):
+                    os.remove(path + suffix)
+
+    def open_names(self) -> list[str]:
+        with self._lock:
+            return list(self._open)
+
+
+tenants = TenantRegistry()
+
+
+def current_database() -> TenantDatabase:
+    return tenants.get(current_tenant.get())
+
+
+def SessionLocal():
+    """Read-write session for the current tenant."""
+    return current_database().SessionLocal()
+
+
+def ReadSessionLocal():
+    """Read-only session for the current tenant."""
+    return current_database().ReadSessionLocal()
+
 
 def get_db():
     db = SessionLocal()
@@ -16,3 +209,11 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+def get_read_only_db():
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
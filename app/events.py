@@ -0,0 +1,139 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import threading
+import uuid
+from collections import defaultdict, deque
+from dataclasses import dataclass
+from typing import Any, Iterable
+
+from .config import EVENT_HISTORY_SIZE, EVENT_KEEPALIVE_SECONDS, EVENT_SUBSCRIBER_QUEUE_SIZE
+from .database import current_tenant
+
+
+@dataclass(frozen=True)
+class Event:
+    id: int
+    type: str
+    data: Any
+    epoch: str = ""
+
+    def encode(self) -> str:
+        payload = json.dumps(self.data, ensure_ascii=False)
+        return f"id: {self.epoch}-{self.id}\nevent: {self.type}\ndata: {payload}\n\n"
+
+
+class Subscription:
+    def __init__(self, topic: str, loop: asyncio.AbstractEventLoop):
+        self.topic = topic
+        self.queue: asyncio.Queue[Event | None] = asyncio.Queue()
+        self._loop = loop
+        self.closed = False
+
+    def deliver(self, event: Event | None) -> None:
+        # Called from worker threads; hand the event over to the subscriber's loop.
+        try:
+            self._loop.call_soon_threadsafe(self._put, event)
+        except RuntimeError:
+            self.closed = True
+
+    def _put(self, event: Event | None) -> None:
+        if self.closed:
+            return
+        if event is not None and self.queue.qsize() >= EVENT_SUBSCRIBER_QUEUE_SIZE:
+            # Slow consumer: end the stream, the client resumes from its last event id.
+            self.closed = True
+            event = None
+        self.queue.put_nowait(event)
+
+
+class EventBroker:
+    """In-process pub/sub with a bounded per-topic history for Last-Event-ID resume."""
+
+    def __init__(self, history_size: int = EVENT_HISTORY_SIZE):
+        self._lock = threading.Lock()
+        # Sequence numbers restart with the process and differ between workers, so the
+        # ids sent to clients carry this broker's epoch and a foreign one is never resumed.
+        self.epoch = uuid.uuid4().hex[:8]
+        self._seq = 0
+        self._history: dict[str, deque[Event]] = defaultdict(lambda: deque(maxlen=history_size))
+        # Id of the newest event each topic has dropped from its history. Ids come from one
+        # sequence shared by all topics, so a topic's own ids skip numbers and gaps mean nothing.
+        self._evicted: dict[str, int] = {}
+        self._subscribers: dict[str, set[Subscription]] = defaultdict(set)
+
+    def publish(self, topics: Iterable[str], event_type: str, data: Any) -> Event:
+        with self._lock:
+            self._seq += 1
+            event = Event(id=self._seq, type=event_type, data=data, epoch=self.epoch)
+            targets: list[Subscription] = []
+            for topic in map(_scoped, topics):
+                history = self._history[topic]
+                if len(history) == history.maxlen:
+                    self._evicted[topic] = history[0].id
+                history.append(event)
+                targets.extend(self._subscribers.get(topic, ()))
+        for subscription in targets:
+            subscription.deliver(event)
+        return event
+
+    def subscribe(self, topic: str, last_event_id: str | None = None) -> Subscription:
+        subscription = Subscription(_scoped(topic), asyncio.get_running_loop())
+        with self._lock:
+            history = self._history.get(subscription.topic)
+            if last_event_id is not None:
+                last_seq = self._resume_point(last_event_id)
+                if last_seq is None or self._evicted.get(subscription.topic, 0) > last_seq:
+                    # Part of the gap is gone (evicted, or sent by another process); the client reloads.
+                    reset = Event(id=self._seq, type="reset", data={"topic": topic}, epoch=self.epoch)
+                    subscription.queue.put_nowait(reset)
+                else:
+                    for event in history or ():
+                        if event.id > last_seq:
+                            subscription.queue.put_nowait(event)
+            self._subscribers[subscription.topic].add(subscription)
+        return subscription
+
+    def _resume_point(self, last_event_id: str) -> int | None:
+        # "<epoch>-<seq>" from this broker, else None.
+        epoch, _, seq = last_event_id.strip().rpartition("-")
+        if epoch != self.epoch or not seq.isdigit() or int(seq) > self._seq:
+            return None
+        return int(seq)
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.topic)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.topic]
+        subscription.closed = True
+
+
+def _scoped(topic: str) -> str:
+    # Entity ids repeat across schools, so topics are namespaced by tenant.
+    return f"{current_tenant.get()}/{topic}"
+
+
+broker = EventBroker()
+
+
+async def event_stream(request, topic: str, last_event_id: str | None = None):
+    subscription = broker.subscribe(topic, last_event_id)
+    try:
+        yield "retry: 3000\n\n"
+        while True:
+            try:
+                event = await asyncio.wait_for(subscription.queue.get(), EVENT_KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                if await request.is_disconnected():
+                    break
+                yield ": keep-alive\n\n"
+                continue
+            if event is None:
+                break
+            yield event.encode()
+    finally:
+        broker.unsubscribe(subscription)
@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import re
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+from .asgi import send_json
+from .config import IDEMPOTENCY_MAX_KEYS, IDEMPOTENCY_TTL_SECONDS
+from .database import current_tenant
+from .metrics import metrics
+
+IDEMPOTENT_ROUTES = [
+    re.compile(r"^/sessions/\d+/attendance/bulk$"),
+    re.compile(r"^/assessments/\d+/scores/bulk$"),
+    re.compile(r"^/courses/\d+/enrollments$"),
+]
+
+# Answers that say nothing about the write itself; a retry with the same key must run again.
+_RETRYABLE = {401, 429}
+
+
+@dataclass
+class _Entry:
+    fingerprint: str
+    created_at: float = field(default_factory=time.monotonic)
+    done: asyncio.Event = field(default_factory=asyncio.Event)
+    status: int | None = None
+    headers: list[tuple[bytes, bytes]] = field(default_factory=list)
+    body: bytes = b""
+
+
+class IdempotencyStore:
+    """Bounded, TTL-evicted map of Idempotency-Key -> request fingerprint and cached response."""
+
+    def __init__(self, max_entries: int = IDEMPOTENCY_MAX_KEYS, ttl: float = IDEMPOTENCY_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+
+    def get(self, key: str) -> _Entry | None:
+        self._evict()
+        return self._entries.get(key)
+
+    def start(self, key: str, fingerprint: str) -> _Entry:
+        self._evict()
+        entry = _Entry(fingerprint=fingerprint)
+        self._entries[key] = entry
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return entry
+
+    def discard(self, key: str, entry: _Entry) -> None:
+        if self._entries.get(key) is entry:
+            del self._entries[key]
+
+    def _evict(self) -> None:
+        cutoff = time.monotonic() - self.ttl
+        while self._entries:
+            key, entry = next(iter(self._entries.items()))
+            if entry.created_at > cutoff:
+                break
+            del self._entries[key]
+
+
+class IdempotencyMiddleware:
+    """Replays the stored response for retried bulk writes carrying the same Idempotency-Key.
+
+    Keys are scoped to the tenant and the caller's Authorization header. A concurrent duplicate waits
+    for the first request to finish instead of running the write again; reusing a key
+    with a different payload is rejected with 422. 5xx responses are not stored.
+    """
+
+    def __init__(self, app, store: IdempotencyStore | None = None):
+        self.app = app
+        self.store = store or IdempotencyStore()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST":
+            return await self.app(scope, receive, send)
+        if not any(p.match(scope["path"]) for p in IDEMPOTENT_ROUTES):
+            return await self.app(scope, receive, send)
+        headers = dict(scope["headers"])
+        idempotency_key = headers.get(b"idempotency-key")
+        if not idempotency_key:
+            return await self.app(scope, receive, send)
+
+        body = await _read_body(receive)
+        principal = hashlib.sha256(
+            current_tenant.get().encode() + b"\0" + headers.get(b"authorization", b"")
+        ).hexdigest()
+        key = f"{principal}:{idempotency_key.decode('latin-1')}"
+        fingerprint = hashlib.sha256(scope["path"].encode() + b"\0" + body).hexdigest()
+
+        while True:
+            entry = self.store.get(key)
+            if entry is None:
+                break
+            if entry.fingerprint != fingerprint:
+                return await send_json(
+                    send, 422, {"detail": "Idempotency-Key was already used for a different request"}
+                )
+            if not entry.done.is_set():
+                metrics.inc("idempotency_waits")
+                await entry.done.wait()
+            if entry.status is not None:
+                metrics.inc("idempotency_replays")
+                return await _replay(send, entry)
+            # The first attempt failed without a storable response; run this one instead.
+
+        entry = self.store.start(key, fingerprint)
+        body_sent = False
+
+        async def replay_receive():
+            nonlocal body_sent
+            if not body_sent:
+                body_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        status = None
+        response_headers: list[tuple[bytes, bytes]] = []
+        chunks: list[bytes] = []
+
+        async def capture_send(message):
+            nonlocal status, response_headers
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                response_headers = list(message.get("headers", []))
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, replay_receive, capture_send)
+        finally:
+            if status is not None and status < 500 and status not in _RETRYABLE:
+                entry.status = status
+                entry.headers = response_headers
+                entry.body = b"".join(chunks)
+            else:
+                self.store.discard(key, entry)
+            entry.done.set()
+
+
+async def _read_body(receive) -> bytes:
+    chunks = []
+    while True:
+        message = await receive()
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body"):
+            return b"".join(chunks)
+
+
+async def _replay(send, entry: _Entry) -> None:
+    await send(
+        {
+            "type": "http.response.start",
+            "status": entry.status,
+            "headers": entry.headers + [(b"idempotent-replayed", b"true")],
+        }
+    )
+    await send({"type": "http.response.body", "body": entry.body})
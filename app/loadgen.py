@@ -0,0 +1,339 @@
+"""Replay recorded traffic or a synthetic usage mix against the API.
+
+    python -m app.loadgen --duration 30 --concurrency 50
+    python -m app.loadgen --replay requests.log.jsonl --base-url http://127.0.0.1:8000
+
+In-process runs use a throwaway copy of each tenant's database that is deleted afterwards.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import random
+import time
+import uuid
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+
+import httpx
+
+from .config import DEFAULT_TENANT, TENANT_HEADER
+from .database import tenants
+from .main import app
+from .tenancy import scratch_tenant
+
+# Share of synthetic traffic per scenario, modeled on a school day.
+SYNTHETIC_MIX = {
+    "login": 0.05,
+    "attendance_bulk": 0.25,
+    "dashboard_poll": 0.5,
+    "report": 0.2,
+}
+
+
+@dataclass
+class RouteStats:
+    latencies: list[float] = field(default_factory=list)
+    statuses: Counter = field(default_factory=Counter)
+    errors: int = 0
+
+    def snapshot(self, elapsed: float) -> dict:
+        ordered = sorted(self.latencies)
+        count = len(ordered)
+
+        def pct(p: float) -> float | None:
+            if not ordered:
+                return None
+            return round(ordered[min(count - 1, int(p * count))] * 1000, 2)
+
+        return {
+            "count": count,
+            "rps": round(count / elapsed, 2) if elapsed else None,
+            "error_rate": round(self.errors / count, 4) if count else 0.0,
+            "p50_ms": pct(0.5),
+            "p95_ms": pct(0.95),
+            "p99_ms": pct(0.99),
+            "max_ms": round(ordered[-1] * 1000, 2) if ordered else None,
+            "statuses": {str(k): v for k, v in sorted(self.statuses.items())},
+        }
+
+
+class Recorder:
+    def __init__(self):
+        self.routes: dict[str, RouteStats] = defaultdict(RouteStats)
+        self.tenants: dict[str, RouteStats] = defaultdict(RouteStats)
+        self.labels: dict[str, str] = {}  # tenant header -> name shown in the report
+        self._templates = [
+            (route.path_regex, route.path, route.methods)
+            for route in app.routes
+            if getattr(route, "methods", None)
+        ]
+        self.started = time.monotonic()
+
+    def route_of(self, method: str, path: str) -> str:
+        path = path.split("?", 1)[0]
+        for regex, template, methods in self._templates:
+            if method in methods and regex.match(path):
+                return f"{method} {template}"
+        return f"{method} {path}"
+
+    async def send(self, client: httpx.AsyncClient, method: str, path: str, **kwargs) -> httpx.Response | None:
+        targets = (
+            self.routes[self.route_of(method, path)],
+            self.tenants[self.labels.get(client.headers.get(TENANT_HEADER), DEFAULT_TENANT)],
+        )
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, path, **kwargs)
+        except httpx.HTTPError:
+            response = None
+        elapsed = time.perf_counter() - started
+        status = response.status_code if response is not None else 0
+        for stats in targets:
+            stats.latencies.append(elapsed)
+            stats.statuses[status] += 1
+            if status == 0 or status >= 400:
+                stats.errors += 1
+        return response
+
+    def report(self) -> dict:
+        elapsed = time.monotonic() - self.started
+        total = sum(len(s.latencies) for s in self.routes.values())
+        errors = sum(s.errors for s in self.routes.values())
+        return {
+            "elapsed_seconds": round(elapsed, 2),
+            "requests": total,
+            "throughput_rps": round(total / elapsed, 2) if elapsed else None,
+            "error_rate": round(errors / total, 4) if total else 0.0,
+            "routes": {name: stats.snapshot(elapsed) for name, stats in sorted(self.routes.items())},
+            "tenants": {name: stats.snapshot(elapsed) for name, stats in sorted(self.tenants.items())},
+        }
+
+
+@dataclass
+class Target:
+    label: str
+    client: httpx.AsyncClient
+    credentials: dict
+
+
+@dataclass
+class Fixture:
+    credentials: dict
+    admin_headers: dict
+    sessions: dict[int, list[int]]  # session id -> enrolled student ids
+    course_ids: list[int]
+    student_ids: list[int]
+
+
+async def _login(client: httpx.AsyncClient, credentials: dict) -> dict:
+    response = await client.post("/auth/login", data=credentials)
+    response.raise_for_status()
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+async def build_fixture(client: httpx.AsyncClient, credentials: dict, courses: int, students: int) -> Fixture:
+    """Create the courses, rosters and sessions the synthetic mix uses."""
+    admin = await _login(client, credentials)
+    run = uuid.uuid4().hex[:6]
+    course_ids = []
+    for i in range(courses):
+        course = await client.post(
+            "/courses", json={"name": f"Loadgen {run} #{i}", "class_name": f"{i % 3 + 1}-A"}, headers=admin
+        )
+        course_ids.append(course.json()["id"])
+    rosters: dict[int, list[int]] = defaultdict(list)
+    student_ids = []
+    for i in range(students):
+        student = await client.post("/students", json={"full_name": f"Loadgen Student {run}-{i}"}, headers=admin)
+        course_id = course_ids[i % courses]
+        student_id = student.json()["id"]
+        await client.post(f"/courses/{course_id}/enrollments", json={"student_id": student_id}, headers=admin)
+        rosters[course_id].append(student_id)
+        student_ids.append(student_id)
+
+    sessions = {}
+    for course_id in course_ids:
+        await client.post(
+            f"/courses/{course_id}/assessments", json={"name": "Midterm", "weight": 1, "max_score": 100}, headers=admin
+        )
+        session = await client.post(f"/courses/{course_id}/sessions", json={"session_date": "2025-03-02"}, headers=admin)
+        sessions[session.json()["id"]] = rosters[course_id]
+    return Fixture(credentials, admin, sessions, course_ids, student_ids)
+
+
+async def remove_fixture(client: httpx.AsyncClient, fixture: Fixture) -> None:
+    # Courses cascade to their enrollments, sessions, attendance, assessments and scores.
+    for course_id in fixture.course_ids:
+        await client.delete(f"/courses/{course_id}", headers=fixture.admin_headers)
+    for student_id in fixture.student_ids:
+        await client.delete(f"/students/{student_id}", headers=fixture.admin_headers)
+
+
+async def _synthetic_worker(client, recorder: Recorder, fixture: Fixture, deadline: float, budget: Counter, limit):
+    scenarios, weights = zip(*SYNTHETIC_MIX.items())
+    etag = None
+    while time.monotonic() < deadline and (limit is None or budget["sent"] < limit):
+        budget["sent"] += 1
+        scenario = random.choices(scenarios, weights)[0]
+        if scenario == "login":
+            await recorder.send(client, "POST", "/auth/login", data=fixture.credentials)
+        elif scenario == "attendance_bulk":
+            session_id, roster = random.choice(list(fixture.sessions.items()))
+            body = [{"student_id": s, "status": random.choice(["present", "present", "late", "absent"])} for s in roster]
+            headers = {**fixture.admin_headers, "Idempotency-Key": uuid.uuid4().hex}
+            await recorder.send(client, "POST", f"/sessions/{session_id}/attendance/bulk", json=body, headers=headers)
+        elif scenario == "report":
+            course_id = random.choice(fixture.course_ids)
+            kind = random.choice(["grades", "attendance"])
+            await recorder.send(client, "GET", f"/courses/{course_id}/{kind}/summary", headers=fixture.admin_headers)
+        else:
+            # Dashboards poll with the last ETag, like the frontend's shared query cache.
+            headers = {**fixture.admin_headers, **({"If-None-Match": etag} if etag else {})}
+            response = await recorder.send(client, "GET", "/dashboard", headers=headers)
+            if response is not None and response.status_code == 200:
+                etag = response.headers.get("etag")
+
+
+async def _replay_worker(client, recorder: Recorder, entries: asyncio.Queue, admin_headers: dict, speed: float):
+    while True:
+        try:
+            entry = entries.get_nowait()
+        except asyncio.QueueEmpty:
+            return
+        if entry.get("think_ms"):
+            await asyncio.sleep(entry["think_ms"] / 1000 / speed)
+        headers = dict(entry.get("headers") or {})
+        if entry.get("auth", True):
+            headers = {**admin_headers, **headers}
+        kwargs = {"headers": headers}
+        if "form" in entry:
+            kwargs["data"] = entry["form"]
+        elif "body" in entry:
+            kwargs["json"] = entry["body"]
+        await recorder.send(client, entry.get("method", "GET").upper(), entry["path"], **kwargs)
+
+
+@contextlib.asynccontextmanager
+async def open_clients(base_url: str | None, concurrency: int, tenant_names: list[str], credentials: dict):
+    """One client per tenant, all sharing the in-process app (or the target server).
+
+    In-process, each tenant is swapped for a throwaway copy with its own random admin.
+    """
+    async with contextlib.AsyncExitStack() as stack:
+        if base_url:
+            limits = httpx.Limits(max_connections=concurrency)
+            options = {"base_url": base_url, "limits": limits}
+            targets = [(name, name, credentials) for name in tenant_names]
+        else:
+            await stack.enter_async_context(app.router.lifespan_context(app))
+            targets = []
+            for name in tenant_names:
+                tenant, scratch_credentials = stack.enter_context(scratch_tenant("loadgen", copy_from=name))
+                targets.append((name, tenant.name, scratch_credentials))
+            options = {"transport": httpx.ASGITransport(app=app), "base_url": "http://loadgen"}
+        clients = []
+        for label, header, target_credentials in targets:
+            client = httpx.AsyncClient(timeout=60, headers={TENANT_HEADER: header}, **options)
+            clients.append(Target(label, await stack.enter_async_context(client), target_credentials))
+        yield clients
+
+
+async def run(args) -> dict:
+    credentials = {"username": args.admin_user, "password": args.admin_password}
+    async with open_clients(args.base_url, args.concurrency, args.tenant or [DEFAULT_TENANT], credentials) as targets:
+        recorder = Recorder()
+        recorder.labels = {t.client.headers[TENANT_HEADER]: t.label for t in targets}
+        if args.replay:
+            with open(args.replay, encoding="utf-8") as fp:
+                lines = [json.loads(line) for line in fp if line.strip()]
+            queue: asyncio.Queue = asyncio.Queue()
+            for entry in lines:
+                queue.put_nowait(entry)
+            admins = [await _login(t.client, t.credentials) for t in targets]
+            recorder.started = time.monotonic()
+            workers = [
+                _replay_worker(targets[i % len(targets)].client, recorder, queue, admins[i % len(targets)], args.speed)
+                for i in range(args.concurrency)
+            ]
+            await asyncio.gather(*workers)
+            return recorder.report()
+
+        fixtures = [await build_fixture(t.client, t.credentials, args.courses, args.students) for t in targets]
+        try:
+            recorder.started = time.monotonic()
+            deadline = recorder.started + args.duration
+            budget: Counter = Counter()
+            workers = [
+                _synthetic_worker(
+                    targets[i % len(targets)].client, recorder, fixtures[i % len(targets)], deadline, budget, args.requests
+                )
+                for i in range(args.concurrency)
+            ]
+            await asyncio.gather(*workers)
+            return recorder.report()
+        finally:
+            if args.base_url:
+                # In-process fixtures go away with the throwaway tenant.
+                for target, fixture in zip(targets, fixtures):
+                    await remove_fixture(target.client, fixture)
+
+
+def print_report(report: dict) -> None:
+    print(
+        f"{report['requests']} requests in {report['elapsed_seconds']}s: "
+        f"{report['throughput_rps']} req/s, error rate {report['error_rate']:.2%}"
+    )
+    print(f"{'route':<48} {'count':>7} {'rps':>8} {'err%':>6} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}  statuses")
+    for name, r in report["routes"].items():
+        print(
+            f"{name:<48} {r['count']:>7} {r['rps']:>8} {r['error_rate']:>6.1%} "
+            f"{r['p50_ms']:>8} {r['p95_ms']:>8} {r['p99_ms']:>8} {r['max_ms']:>8}  {r['statuses']}"
+        )
+    if len(report["tenants"]) > 1:
+        print(f"{'tenant':<48} {'count':>7} {'rps':>8} {'err%':>6} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}")
+        for name, r in report["tenants"].items():
+            print(
+                f"{name:<48} {r['count']:>7} {r['rps']:>8} {r['error_rate']:>6.1%} "
+                f"{r['p50_ms']:>8} {r['p95_ms']:>8} {r['p99_ms']:>8} {r['max_ms']:>8}"
+            )
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Load-test the API with replayed or synthetic traffic.")
+    parser.add_argument("--replay", help="JSONL request log to replay instead of the synthetic mix")
+    parser.add_argument("--base-url", help="target a running server (default: in-process ASGI app)")
+    parser.add_argument("--tenant", action="append", help="school tenant to target (repeatable)")
+    parser.add_argument("--concurrency", type=int, default=20, help="concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=10, help="synthetic run length in seconds")
+    parser.add_argument("--requests", type=int, help="stop the synthetic run after this many requests")
+    parser.add_argument("--speed", type=float, default=1.0, help="replay think-time divisor")
+    parser.add_argument("--courses", type=int, default=5)
+    parser.add_argument("--students", type=int, default=150)
+    parser.add_argument("--admin-user", default="admin", help="admin account on the --base-url server")
+    parser.add_argument(
+        "--admin-password",
+        default=os.getenv("LOADGEN_ADMIN_PASSWORD"),
+        help="its password (default: $LOADGEN_ADMIN_PASSWORD)",
+    )
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args(argv)
+    if args.base_url and not args.admin_password:
+        parser.error("--admin-password (or LOADGEN_ADMIN_PASSWORD) is required with --base-url")
+    unknown = [name for name in args.tenant or [] if not tenants.exists(name)]
+    if not args.base_url and unknown:
+        parser.error(f"unknown tenant: {', '.join(unknown)}")
+
+    report = asyncio.run(run(args))
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,37 +1,42 @@
-from fastapi import Depends, FastAPI, HTTPException, status, Response
+from fastapi import Depends, FastAPI, Header, HTTPException, Query, Request, status, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
-from . import crud, models, schemas
-from .database import Base, engine, get_db
+from . import archive, backup, cache, changelog, crud, models, reports, schemas, search
+from .admission import AdmissionMiddleware
+from .database import current_database, current_tenant, get_db, get_read_only_db
+from .events import event_stream
+from .idempotency import IdempotencyMiddleware
+from .streaming import stream_rows
 from .security import create_access_token, decode_access_token
-from .config import API_KEY
-
-Base.metadata.create_all(bind=engine)
+from .coalescer import write_coalescer
+from .config import API_KEY, DEFAULT_TENANT, WRITE_COALESCING
+from .metrics import metrics
+from .tenancy import TenantMiddleware
 
 app = FastAPI(title="학생 출결/성적 관리 API", version="0.1.0")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
 
 @app.on_event("startup")
-def seed_admin():
-    # create default admin if not exists
-    db = next(get_db())
-    if not crud.get_user_by_username(db, "admin"):
-        crud.create_user(
-            db,
-            schemas.UserCreate(username="admin", password="admin123", role="admin"),
-        )
-    db.close()
-
+def open_default_tenant():
+    # Other schools are opened (schema, search index, default admin) on their first request.
+    current_database()
+
+# Admission runs outside idempotency so load-shed responses are never cached under a key.
+app.add_middleware(IdempotencyMiddleware)
+app.add_middleware(AdmissionMiddleware)
+app.add_middleware(TenantMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],
 )
 
 
@@ -40,8 +45,27 @@ def healthcheck():
     return {"status": "ok"}
 
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
-    username = decode_access_token(token)
+def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_read_only_db)):
+    return _user_from_token(db, token)
+
+
+def get_stream_user(
+    request: Request,
+    access_token: str | None = None,
+    db: Session = Depends(get_read_only_db),
+):
+    # EventSource cannot send headers, so streams also accept ?access_token=.
+    token = access_token
+    authorization = request.headers.get("Authorization", "")
+    if authorization.lower().startswith("bearer "):
+        token = authorization[7:]
+    if not token:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated")
+    return _user_from_token(db, token)
+
+
+def _user_from_token(db: Session, token: str):
+    username = decode_access_token(token, tenant=current_tenant.get())
     if not username:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
     user = crud.get_user_by_username(db, username)
@@ -50,18 +74,52 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
     return user
 
 
+def get_read_db(
+    archived: bool = Query(False, description="Read closed terms from the archive"),
+    db: Session = Depends(get_read_only_db),
+):
+    if not archived:
+        yield db
+        return
+    yield from archive.get_archive_db()
+
+
 def require_role(user: models.User, roles: set[str]):
     if user.role not in roles:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Forbidden")
     return user
 
 
+def check_etag(
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_read_only_db),
+    _: models.User = Depends(get_current_user),
+):
+    # Read before the data itself, so a response is never tagged newer than its content.
+    version = cache.data_version(db)
+    etag = cache.etag(version)
+    if request.headers.get("If-None-Match") == etag:
+        raise HTTPException(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    request.state.etag = etag
+    request.state.data_version = version
+
+
+@app.get("/metrics")
+def get_metrics(current: models.User = Depends(get_current_user)):
+    require_role(current, {"admin"})
+    # A school admin sees its own tenant's series; the default tenant sees the whole process.
+    tenant = current_tenant.get()
+    return metrics.snapshot(tenant=None if tenant == DEFAULT_TENANT else tenant)
+
+
 @app.post("/auth/login", response_model=schemas.Token)
-def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_read_only_db)):
     user = crud.authenticate_user(db, form_data.username, form_data.password)
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Incorrect username or password")
-    token = create_access_token(subject=user.username)
+    token = create_access_token(subject=user.username, tenant=current_tenant.get())
     return {"access_token": token, "token_type": "bearer"}
 
 
@@ -88,8 +146,21 @@ def create_student(
     return crud.create_student(db, payload)
 
 
-@app.get("/students", response_model=list[schemas.StudentRead])
-def list_students(db: Session = Depends(get_db), _: models.User = Depends(get_current_user)):
+@app.get("/students", response_model=list[schemas.StudentRead], dependencies=[Depends(check_etag)])
+def list_students(
+    request: Request,
+    stream: str | None = Query(None, pattern="^(json|ndjson)$"),
+    db: Session = Depends(get_read_only_db),
+    _: models.User = Depends(get_current_user),
+):
+    if stream:
+        return stream_rows(
+            crud.students_query(),
+            schemas.StudentRead,
+            stream,
+            db.get_bind(),
+            headers={"ETag": request.state.etag},
+        )
     return crud.list_students(db)
 
 
@@ -119,9 +190,10 @@ def delete_student(student_id: int, db: Session = Depends(get_db), current: mode
 @app.get(
     "/students/{student_id}/grades",
     response_model=list[schemas.GradeSummary],
+    dependencies=[Depends(check_etag)],
 )
 def get_student_grades(
-    student_id: int, db: Session = Depends(get_db), _: models.User = Depends(get_current_user)
+    student_id: int, db: Session = Depends(get_read_db), _: models.User = Depends(get_current_user)
 ):
     summaries = crud.grade_summary_for_student(db, student_id)
     return [
@@ -136,6 +208,77 @@ def get_student_grades(
     ]
 
 
+@app.get("/dashboard", response_model=schemas.Dashboard, dependencies=[Depends(check_etag)])
+def dashboard(request: Request, db: Session = Depends(get_read_only_db), _: models.User = Depends(get_current_user)):
+    version = request.state.data_version
+
+    def build() -> bytes:
+        snapshot = schemas.Dashboard(version=version, **crud.dashboard_snapshot(db))
+        return snapshot.model_dump_json().encode()
+
+    return Response(
+        content=cache.cached("dashboard", version, build),
+        media_type="application/json",
+        headers={"ETag": request.state.etag},
+    )
+
+
+@app.post("/admin/archive", response_model=schemas.ArchiveResult)
+def archive_closed_terms(payload: schemas.ArchiveRequest, current: models.User = Depends(get_current_user)):
+    require_role(current, {"admin"})
+    try:
+        return archive.archive_closed_terms(payload.before)
+    except IntegrityError as exc:
+        raise HTTPException(status_code=409, detail=f"Archive conflict, nothing was moved: {exc.orig}")
+
+
+@app.post("/admin/backup", response_model=schemas.BackupJob, status_code=status.HTTP_202_ACCEPTED)
+def start_backup(payload: schemas.BackupRequest, current: models.User = Depends(get_current_user)):
+    require_role(current, {"admin"})
+    try:
+        return backup.start_backup(backup.snapshot_path(payload.name), payload.method)
+    except FileExistsError:
+        raise HTTPException(status_code=409, detail="Snapshot already exists")
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+
+@app.get("/admin/backup/{job_id}", response_model=schemas.BackupJob)
+def backup_status(job_id: str, current: models.User = Depends(get_current_user)):
+    require_role(current, {"admin"})
+    job = backup.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Backup job not found")
+    return job
+
+
+@app.get("/sync", response_model=schemas.SyncPage)
+def sync_changes(
+    since: int = Query(0, ge=0),
+    limit: int = Query(500, ge=1, le=5000),
+    db: Session = Depends(get_read_only_db),
+    _: models.User = Depends(get_current_user),
+):
+    return changelog.changes_since(db, since, limit)
+
+
+@app.get("/search", response_model=list[schemas.SearchHit], dependencies=[Depends(check_etag)])
+def search_directory(
+    q: str = Query(..., min_length=1),
+    type: str | None = Query(None, pattern="^(student|course)$"),
+    limit: int = Query(10, ge=1, le=100),
+    db: Session = Depends(get_read_only_db),
+    _: models.User = Depends(get_current_user),
+):
+    return search.search(db, q, type, limit)
+
+
+@app.post("/search/rebuild")
+def rebuild_search(db: Session = Depends(get_db), current: models.User = Depends(get_current_user)):
+    require_role(current, {"admin"})
+    return search.rebuild_search_index(db)
+
+
 # Courses
 @app.post(
     "/courses",
@@ -151,8 +294,21 @@ def create_course(
     return crud.create_course(db, payload)
 
 
-@app.get("/courses", response_model=list[schemas.CourseRead])
-def list_courses(db: Session = Depends(get_db), _: models.User = Depends(get_current_user)):
+@app.get("/courses", response_model=list[schemas.CourseRead], dependencies=[Depends(check_etag)])
+def list_courses(
+    request: Request,
+    stream: str | None = Query(None, pattern="^(json|ndjson)$"),
+    db: Session = Depends(get_read_db),
+    _: models.User = Depends(get_current_user),
+):
+    if stream:
+        return stream_rows(
+            crud.courses_query(),
+            schemas.CourseRead,
+            stream,
+            db.get_bind(),
+            headers={"ETag": request.state.etag},
+        )
     return crud.list_courses(db)
 
 
@@ -202,8 +358,26 @@ def enroll_student(
         raise HTTPException(status_code=400, detail="Student already enrolled for this course")
 
 
-@app.get("/courses/{course_id}/enrollments", response_model=list[schemas.EnrollmentRead])
-def list_enrollments(course_id: int, db: Session = Depends(get_db), _: models.User = Depends(get_current_user)):
+@app.get(
+    "/courses/{course_id}/enrollments",
+    response_model=list[schemas.EnrollmentRead],
+    dependencies=[Depends(check_etag)],
+)
+def list_enrollments(
+    course_id: int,
+    request: Request,
+    stream: str | None = Query(None, pattern="^(json|ndjson)$"),
+    db: Session = Depends(get_read_db),
+    _: models.User = Depends(get_current_user),
+):
+    if stream:
+        return stream_rows(
+            crud.enrollments_query(course_id),
+            schemas.EnrollmentRead,
+            stream,
+            db.get_bind(),
+            headers={"ETag": request.state.etag},
+        )
     return crud.list_enrollments(db, course_id)
 
 
@@ -227,8 +401,26 @@ def create_session(
         raise HTTPException(status_code=400, detail="Session already exists for this date")
 
 
-@app.get("/courses/{course_id}/sessions", response_model=list[schemas.SessionRead])
-def list_sessions(course_id: int, db: Session = Depends(get_db), _: models.User = Depends(get_current_user)):
+@app.get(
+    "/courses/{course_id}/sessions",
+    response_model=list[schemas.SessionRead],
+    dependencies=[Depends(check_etag)],
+)
+def list_sessions(
+    course_id: int,
+    request: Request,
+    stream: str | None = Query(None, pattern="^(json|ndjson)$"),
+    db: Session = Depends(get_read_db),
+    _: models.User = Depends(get_current_user),
+):
+    if stream:
+        return stream_rows(
+            crud.sessions_query(course_id),
+            schemas.SessionRead,
+            stream,
+            db.get_bind(),
+            headers={"ETag": request.state.etag},
+        )
     return crud.list_sessions(db, course_id)
 
 
@@ -244,22 +436,76 @@ def upsert_attendance(
     current: models.User = Depends(get_current_user),
 ):
     require_role(current, {"admin", "teacher"})
+    if WRITE_COALESCING:
+        db.close()  # don't hold a pooled connection while the writer thread needs one
+        return write_coalescer.run(
+            crud.stage_attendance,
+            session_id,
+            payload,
+            after_commit=lambda db, records: crud.publish_attendance(db, session_id, records),
+        )
     return crud.upsert_attendance(db, session_id, payload)
 
 
 @app.get(
     "/sessions/{session_id}/attendance",
     response_model=list[schemas.AttendanceRead],
+    dependencies=[Depends(check_etag)],
 )
-def list_attendance(session_id: int, db: Session = Depends(get_db), _: models.User = Depends(get_current_user)):
+def list_attendance(
+    session_id: int,
+    request: Request,
+    stream: str | None = Query(None, pattern="^(json|ndjson)$"),
+    db: Session = Depends(get_read_db),
+    _: models.User = Depends(get_current_user),
+):
+    if stream:
+        return stream_rows(
+            crud.attendance_query(session_id),
+            schemas.AttendanceRead,
+            stream,
+            db.get_bind(),
+            headers={"ETag": request.state.etag},
+        )
     return crud.list_attendance(db, session_id)
 
 
+def _attendance_stream(request: Request, topic: str, last_event_id: str | None):
+    return StreamingResponse(
+        event_stream(request, topic, last_event_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.get("/sessions/{session_id}/attendance/stream")
+def stream_session_attendance(
+    session_id: int,
+    request: Request,
+    last_event_id: str | None = Header(None),
+    _: models.User = Depends(get_stream_user),
+):
+    return _attendance_stream(request, f"session:{session_id}", last_event_id)
+
+
+@app.get("/courses/{course_id}/attendance/stream")
+def stream_course_attendance(
+    course_id: int,
+    request: Request,
+    last_event_id: str | None = Header(None),
+    _: models.User = Depends(get_stream_user),
+):
+    return _attendance_stream(request, f"course:{course_id}", last_event_id)
+
+
 @app.get(
     "/courses/{course_id}/attendance/summary",
     response_model=schemas.AttendanceSummary,
+    dependencies=[Depends(check_etag)],
 )
-def attendance_summary(course_id: int, db: Session = Depends(get_db), _: models.User = Depends(get_current_user)):
+def attendance_summary(
+    course_id: int, db: Session = Depends(get_read_db), _: models.User = Depends(get_current_user)
+):
     return crud.attendance_summary_by_course(db, course_id)
 
 
@@ -283,9 +529,13 @@ def create_assessment(
         raise HTTPException(status_code=400, detail="Assessment with this name already exists")
 
 
-@app.get("/courses/{course_id}/assessments", response_model=list[schemas.AssessmentRead])
+@app.get(
+    "/courses/{course_id}/assessments",
+    response_model=list[schemas.AssessmentRead],
+    dependencies=[Depends(check_etag)],
+)
 def list_assessments(
-    course_id: int, db: Session = Depends(get_db), _: models.User = Depends(get_current_user)
+    course_id: int, db: Session = Depends(get_read_db), _: models.User = Depends(get_current_user)
 ):
     return crud.list_assessments(db, course_id)
 
@@ -302,15 +552,59 @@ def upsert_scores(
     current: models.User = Depends(get_current_user),
 ):
     require_role(current, {"admin", "teacher"})
+    if WRITE_COALESCING:
+        db.close()
+        return write_coalescer.run(crud.stage_scores, assessment_id, payload)
     return crud.upsert_scores(db, assessment_id, payload)
 
 
 @app.get(
     "/courses/{course_id}/grades/summary",
     response_model=schemas.CourseGradeSummary,
+    dependencies=[Depends(check_etag)],
 )
-def grade_summary(course_id: int, db: Session = Depends(get_db), _: models.User = Depends(get_current_user)):
+def grade_summary(
+    course_id: int, db: Session = Depends(get_read_db), _: models.User = Depends(get_current_user)
+):
     data = crud.grade_summary_for_course(db, course_id)
     if not data:
         raise HTTPException(status_code=404, detail="Course not found")
     return data
+
+
+@app.post("/courses/{course_id}/grades/what-if", response_model=schemas.WhatIfResult)
+def grade_what_if(
+    course_id: int,
+    payload: schemas.WhatIfRequest,
+    db: Session = Depends(get_read_db),
+    current: models.User = Depends(get_current_user),
+):
+    require_role(current, {"admin", "teacher"})
+    changes = {change.assessment_id: change for change in payload.changes}
+    data = crud.what_if_grades(db, course_id, changes)
+    if not data:
+        raise HTTPException(status_code=404, detail="Course not found")
+    unknown = sorted(set(changes) - {a["assessment_id"] for a in data["assessments"]})
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Assessments not in course: {unknown}")
+    return data
+
+
+# Reports
+@app.get("/reports/report-cards")
+def report_cards(
+    class_name: str | None = None,
+    grade_level: str | None = None,
+    fmt: str = Query("html", alias="format", pattern="^(html|json)$"),
+    db: Session = Depends(get_read_only_db),
+    current: models.User = Depends(get_current_user),
+):
+    require_role(current, {"admin", "teacher"})
+    if (class_name is None) == (grade_level is None):
+        raise HTTPException(status_code=400, detail="Specify exactly one of class_name or grade_level")
+    cards = reports.collect_report_cards(db, class_name=class_name, grade_level=grade_level)
+    return StreamingResponse(
+        reports.stream_report_zip(cards, fmt),
+        media_type="application/zip",
+        headers={"Content-Disposition": 'attachment; filename="report-cards.zip"'},
+    )
@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import threading
+from collections import defaultdict, deque
+
+
+def _key(name: str, labels: dict) -> str:
+    if not labels:
+        return name
+    inner = ",".join(f"{k}={v}" for k, v in sorted(labels.items()))
+    return f"{name}{{{inner}}}"
+
+
+def _has_label(key: str, name: str, value: str) -> bool:
+    start = key.find("{")
+    return start != -1 and f"{name}={value}" in key[start + 1 : -1].split(",")
+
+
+class _Summary:
+    def __init__(self, window: int = 1024):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.recent: deque[float] = deque(maxlen=window)
+
+    def observe(self, value: float) -> None:
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+        self.recent.append(value)
+
+    def snapshot(self) -> dict:
+        ordered = sorted(self.recent)
+
+        def pct(p: float) -> float | None:
+            if not ordered:
+                return None
+            return round(ordered[min(len(ordered) - 1, int(p * len(ordered)))], 4)
+
+        return {
+            "count": self.count,
+            "avg": round(self.total / self.count, 4) if self.count else None,
+            "p50": pct(0.5),
+            "p95": pct(0.95),
+            "max": round(self.max, 4),
+        }
+
+
+class Metrics:
+    """Process-local counters, gauges and summaries exposed via /metrics."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: dict[str, float] = defaultdict(float)
+        self._gauges: dict[str, float] = {}
+        self._summaries: dict[str, _Summary] = defaultdict(_Summary)
+
+    def inc(self, name: str, value: float = 1, **labels) -> None:
+        with self._lock:
+            self._counters[_key(name, labels)] += value
+
+    def set_gauge(self, name: str, value: float, **labels) -> None:
+        with self._lock:
+            self._gauges[_key(name, labels)] = value
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        with self._lock:
+            self._summaries[_key(name, labels)].observe(value)
+
+    def snapshot(self, tenant: str | None = None) -> dict:
+        """All series, or only those labelled with ``tenant``."""
+        keep = (lambda key: True) if tenant is None else (lambda key: _has_label(key, "tenant", tenant))
+        with self._lock:
+            return {
+                "counters": {k: v for k, v in self._counters.items() if keep(k)},
+                "gauges": {k: v for k, v in self._gauges.items() if keep(k)},
+                "summaries": {k: v.snapshot() for k, v in self._summaries.items() if keep(k)},
+            }
+
+
+metrics = Metrics()
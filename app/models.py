@@ -27,6 +27,7 @@ class AttendanceStatus(str, Enum):
 
 class Student(Base):
     __tablename__ = "students"
+    __table_args__ = {"sqlite_autoincrement": True}
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     full_name: Mapped[str] = mapped_column(String(120), nullable=False)
@@ -42,6 +43,7 @@ class Student(Base):
 
 class Course(Base):
     __tablename__ = "courses"
+    __table_args__ = {"sqlite_autoincrement": True}
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     name: Mapped[str] = mapped_column(String(120), nullable=False)
@@ -59,7 +61,10 @@ class Course(Base):
 
 class Enrollment(Base):
     __tablename__ = "enrollments"
-    __table_args__ = (UniqueConstraint("course_id", "student_id", name="uq_course_student"),)
+    __table_args__ = (
+        UniqueConstraint("course_id", "student_id", name="uq_course_student"),
+        {"sqlite_autoincrement": True},
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     course_id: Mapped[int] = mapped_column(ForeignKey("courses.id"), nullable=False)
@@ -88,7 +93,10 @@ class User(Base):
 
 class Session(Base):
     __tablename__ = "sessions"
-    __table_args__ = (UniqueConstraint("course_id", "session_date", name="uq_course_session_date"),)
+    __table_args__ = (
+        UniqueConstraint("course_id", "session_date", name="uq_course_session_date"),
+        {"sqlite_autoincrement": True},
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     course_id: Mapped[int] = mapped_column(ForeignKey("courses.id"), nullable=False)
@@ -108,7 +116,10 @@ class Session(Base):
 
 class AttendanceRecord(Base):
     __tablename__ = "attendance_records"
-    __table_args__ = (UniqueConstraint("session_id", "student_id", name="uq_session_student_attendance"),)
+    __table_args__ = (
+        UniqueConstraint("session_id", "student_id", name="uq_session_student_attendance"),
+        {"sqlite_autoincrement": True},
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     session_id: Mapped[int] = mapped_column(ForeignKey("sessions.id"), nullable=False)
@@ -127,7 +138,10 @@ class AttendanceRecord(Base):
 
 class Assessment(Base):
     __tablename__ = "assessments"
-    __table_args__ = (UniqueConstraint("course_id", "name", name="uq_course_assessment_name"),)
+    __table_args__ = (
+        UniqueConstraint("course_id", "name", name="uq_course_assessment_name"),
+        {"sqlite_autoincrement": True},
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     course_id: Mapped[int] = mapped_column(ForeignKey("courses.id"), nullable=False)
@@ -145,7 +159,10 @@ class Assessment(Base):
 
 class Score(Base):
     __tablename__ = "scores"
-    __table_args__ = (UniqueConstraint("assessment_id", "student_id", name="uq_assessment_student"),)
+    __table_args__ = (
+        UniqueConstraint("assessment_id", "student_id", name="uq_assessment_student"),
+        {"sqlite_autoincrement": True},
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     assessment_id: Mapped[int] = mapped_column(ForeignKey("assessments.id"), nullable=False)
@@ -158,3 +175,16 @@ class Score(Base):
 
     assessment = relationship("Assessment", back_populates="scores")
     student = relationship("Student", back_populates="scores")
+
+
+class ChangeLog(Base):
+    __tablename__ = "change_log"
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    table_name: Mapped[str] = mapped_column(String(50), nullable=False)
+    row_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    op: Mapped[str] = mapped_column(String(10), nullable=False)  # upsert / delete
+    changed_at: Mapped[datetime] = mapped_column(
+        DateTime, server_default=func.now(), nullable=False
+    )
@@ -0,0 +1,217 @@
+from __future__ import annotations
+
+import html
+import io
+import json
+import zipfile
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Iterator
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from .config import REPORT_WORKERS
+from .crud import score_points
+from .models import (
+    Assessment,
+    AttendanceRecord,
+    Course,
+    Enrollment,
+    Score,
+    Session as CourseSession,
+    Student,
+)
+
+
+def collect_report_cards(db: Session, class_name: str | None = None, grade_level: str | None = None) -> list[dict]:
+    """Build plain-dict report cards for every matching student in six queries.
+
+    Students are selected by ``grade_level`` or by enrollment in a course of
+    ``class_name``; each card covers all of the student's courses. Grades use the
+    same formula as ``crud.grade_summary_for_student``.
+    """
+    if grade_level is not None:
+        student_ids = select(Student.id).where(Student.grade_level == grade_level)
+    else:
+        student_ids = (
+            select(Enrollment.student_id)
+            .join(Course, Course.id == Enrollment.course_id)
+            .where(Course.class_name == class_name)
+        )
+    course_ids = select(Enrollment.course_id).where(Enrollment.student_id.in_(student_ids)).distinct()
+
+    students = db.execute(
+        select(Student.id, Student.full_name, Student.email, Student.grade_level)
+        .where(Student.id.in_(student_ids))
+        .order_by(Student.full_name, Student.id)
+    ).mappings().all()
+    enrollments = db.execute(
+        select(Enrollment.student_id, Course.id, Course.name, Course.class_name, Course.teacher_name)
+        .join(Course, Course.id == Enrollment.course_id)
+        .where(Enrollment.student_id.in_(student_ids))
+        .order_by(Course.name, Course.id)
+    ).all()
+    assessments: dict[int, list] = defaultdict(list)
+    for row in db.execute(
+        select(Assessment.id, Assessment.course_id, Assessment.name, Assessment.weight, Assessment.max_score)
+        .where(Assessment.course_id.in_(course_ids))
+        .order_by(Assessment.due_date, Assessment.id)
+    ):
+        assessments[row.course_id].append(row)
+    scores = {
+        (row.student_id, row.assessment_id): row
+        for row in db.execute(
+            select(Score.student_id, Score.assessment_id, Score.raw_score, Score.adjusted_score)
+            .join(Assessment, Assessment.id == Score.assessment_id)
+            .where(Assessment.course_id.in_(course_ids), Score.student_id.in_(student_ids))
+        )
+    }
+    session_counts = dict(
+        db.execute(
+            select(CourseSession.course_id, func.count(CourseSession.id))
+            .where(CourseSession.course_id.in_(course_ids))
+            .group_by(CourseSession.course_id)
+        ).all()
+    )
+    attendance: dict[tuple[int, int], dict[str, int]] = defaultdict(dict)
+    for student_id, course_id, status, count in db.execute(
+        select(AttendanceRecord.student_id, CourseSession.course_id, AttendanceRecord.status, func.count())
+        .join(CourseSession, CourseSession.id == AttendanceRecord.session_id)
+        .where(CourseSession.course_id.in_(course_ids), AttendanceRecord.student_id.in_(student_ids))
+        .group_by(AttendanceRecord.student_id, CourseSession.course_id, AttendanceRecord.status)
+    ):
+        attendance[(student_id, course_id)][status.value] = count
+
+    courses_by_student: dict[int, list] = defaultdict(list)
+    for student_id, course_id, name, course_class, teacher in enrollments:
+        items = []
+        weighted = 0.0
+        for assessment in assessments[course_id]:
+            score = scores.get((student_id, assessment.id))
+            if score:
+                weighted += score_points(score.raw_score, score.adjusted_score, assessment.max_score, assessment.weight)
+            items.append(
+                {
+                    "name": assessment.name,
+                    "weight": float(assessment.weight),
+                    "max_score": float(assessment.max_score),
+                    "raw_score": _number(score.raw_score) if score else None,
+                    "adjusted_score": _number(score.adjusted_score) if score else None,
+                }
+            )
+        counts = attendance[(student_id, course_id)]
+        courses_by_student[student_id].append(
+            {
+                "course_id": course_id,
+                "course_name": name,
+                "class_name": course_class,
+                "teacher_name": teacher,
+                "total_weight": float(sum(a.weight for a in assessments[course_id]) or 1),
+                "weighted_score": round(weighted, 2),
+                "assessments": items,
+                "attendance": {
+                    "session_count": session_counts.get(course_id, 0),
+                    **{status: counts.get(status, 0) for status in ("present", "late", "absent", "excused")},
+                },
+            }
+        )
+
+    generated_at = datetime.utcnow().isoformat(timespec="seconds")
+    return [
+        {"student": dict(student), "generated_at": generated_at, "courses": courses_by_student[student["id"]]}
+        for student in students
+    ]
+
+
+def _number(value) -> float | None:
+    # Score columns are Numeric (Decimal); cards carry plain floats so they serialize as JSON.
+    return None if value is None else float(value)
+
+
+def render_report_card(card: dict, fmt: str) -> tuple[str, bytes]:
+    """Return (file name, document) for one card; runs in worker processes."""
+    student = card["student"]
+    stem = f"{student['id']:06d}"
+    if fmt == "json":
+        return f"{stem}.json", json.dumps(card, ensure_ascii=False, indent=2).encode()
+    e = html.escape
+    sections = []
+    for course in card["courses"]:
+        rows = "".join(
+            f"<tr><td>{e(a['name'])}</td><td>{a['weight']:g}</td><td>{_fmt(a['raw_score'])}</td>"
+            f"<td>{_fmt(a['adjusted_score'])}</td><td>{a['max_score']:g}</td></tr>"
+            for a in course["assessments"]
+        )
+        att = course["attendance"]
+        sections.append(
+            f"<section><h2>{e(course['course_name'])}</h2>"
+            f"<p>{e(course['class_name'] or '')} {e(course['teacher_name'] or '')}</p>"
+            f"<table><tr><th>평가</th><th>가중치</th><th>원점수</th><th>조정 점수</th><th>만점</th></tr>{rows}</table>"
+            f"<p>환산 점수: <strong>{course['weighted_score']:g}</strong></p>"
+            f"<p>출결({att['session_count']}회): 출석 {att['present']} · 지각 {att['late']} · "
+            f"결석 {att['absent']} · 공결 {att['excused']}</p></section>"
+        )
+    document = (
+        f"<!doctype html><html lang=\"ko\"><head><meta charset=\"utf-8\">"
+        f"<title>성적표 - {e(student['full_name'])}</title></head><body>"
+        f"<h1>{e(student['full_name'])}</h1><p>{e(student['grade_level'] or '')} · 발행 {card['generated_at']}</p>"
+        f"{''.join(sections) or '<p>수강 강좌 없음</p>'}</body></html>"
+    )
+    return f"{stem}.html", document.encode()
+
+
+def _fmt(value: float | None) -> str:
+    return "-" if value is None else f"{value:g}"
+
+
+def _render_chunk(cards: list[dict], fmt: str) -> list[tuple[str, bytes]]:
+    return [render_report_card(card, fmt) for card in cards]
+
+
+class _ZipBuffer(io.RawIOBase):
+    """Write-only, unseekable sink, so ``zipfile`` streams entries with data descriptors."""
+
+    def __init__(self):
+        self.chunks: list[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+def stream_report_zip(cards: list[dict], fmt: str, workers: int = REPORT_WORKERS) -> Iterator[bytes]:
+    """Render cards across a process pool and yield the zip archive as it is written."""
+    sink = _ZipBuffer()
+    chunk = 50
+    batches = [cards[i : i + chunk] for i in range(0, len(cards), chunk)]
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        manifest = [
+            {"student_id": c["student"]["id"], "full_name": c["student"]["full_name"], "courses": len(c["courses"])}
+            for c in cards
+        ]
+        archive.writestr("manifest.json", json.dumps(manifest, ensure_ascii=False, indent=2))
+        yield sink.drain()
+        if workers > 1 and len(batches) > 1:
+            with ProcessPoolExecutor(max_workers=min(workers, len(batches))) as pool:
+                for rendered in pool.map(_render_chunk, batches, [fmt] * len(batches)):
+                    yield from _write_entries(archive, sink, rendered)
+        else:
+            for batch in batches:
+                yield from _write_entries(archive, sink, _render_chunk(batch, fmt))
+    yield sink.drain()
+
+
+def _write_entries(archive: zipfile.ZipFile, sink: _ZipBuffer, rendered: list[tuple[str, bytes]]) -> Iterator[bytes]:
+    for name, document in rendered:
+        archive.writestr(name, document)
+    yield sink.drain()
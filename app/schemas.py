@@ -1,5 +1,5 @@
 from datetime import date, datetime
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 
 from pydantic import BaseModel, Field, EmailStr, field_validator
 
@@ -159,6 +159,150 @@ class CourseGradeSummary(BaseModel):
     assessments: List[AssessmentRead]
 
 
+class AssessmentChange(BaseModel):
+    assessment_id: int
+    weight: Optional[float] = Field(None, ge=0, example=0.3)
+    max_score: Optional[float] = Field(None, gt=0, example=50)
+
+
+class WhatIfRequest(BaseModel):
+    changes: List[AssessmentChange]
+
+
+class WhatIfAssessment(BaseModel):
+    assessment_id: int
+    name: str
+    old_weight: float
+    new_weight: float
+    old_max_score: float
+    new_max_score: float
+
+
+class WhatIfStudent(BaseModel):
+    student_id: int
+    full_name: str
+    old_score: float
+    new_score: float
+    delta: float
+    old_rank: int
+    new_rank: int
+    rank_change: int
+
+
+class WhatIfResult(BaseModel):
+    course_id: int
+    course_name: str
+    old_total_weight: float
+    new_total_weight: float
+    assessments: List[WhatIfAssessment]
+    students: List[WhatIfStudent]
+
+
+class DashboardCounts(BaseModel):
+    students: int
+    courses: int
+    sessions: int
+    assessments: int
+
+
+class DashboardSession(BaseModel):
+    id: int
+    course_id: int
+    course_name: str
+    session_date: date
+    topic: Optional[str] = None
+
+
+class CourseStats(AttendanceSummary):
+    course_name: str
+    average_score: Optional[float]
+
+
+class IndexEntry(BaseModel):
+    id: int
+    name: str
+    detail: Optional[str] = None
+
+
+class Dashboard(BaseModel):
+    version: int
+    counts: DashboardCounts
+    recent_sessions: List[DashboardSession]
+    course_stats: List[CourseStats]
+    students: List[IndexEntry]
+    courses: List[IndexEntry]
+
+
+class SyncChange(BaseModel):
+    cursor: int
+    table: str
+    id: int
+    op: str
+    data: Optional[Dict[str, Any]] = None
+
+
+class SyncPage(BaseModel):
+    cursor: int
+    has_more: bool
+    changes: List[SyncChange]
+
+
+class ArchiveRequest(BaseModel):
+    before: date = Field(..., description="Archive courses whose last session is before this date")
+
+
+class ArchiveResult(BaseModel):
+    before: date
+    courses_archived: int
+    rows: Dict[str, int]
+
+
+class BackupRequest(BaseModel):
+    name: Optional[str] = Field(
+        None,
+        pattern=r"^[A-Za-z0-9][A-Za-z0-9._-]{0,99}$",
+        description="Snapshot file name under BACKUP_DIR/<tenant>/; defaults to <timestamp>-<random>.db",
+    )
+    method: str = Field("backup", pattern="^(backup|vacuum)$")
+
+
+class BackupFile(BaseModel):
+    destination: str
+    pages_total: int
+    pages_done: int
+    integrity: Optional[str] = None
+
+    class Config:
+        from_attributes = True
+
+
+class BackupJob(BaseModel):
+    id: str
+    destination: str
+    files: List[BackupFile]
+    method: str
+    status: str
+    pages_total: int
+    pages_done: int
+    restarts: int
+    progress: float
+    started_at: datetime
+    duration_seconds: Optional[float] = None
+    integrity: Optional[str] = None
+    error: Optional[str] = None
+
+    class Config:
+        from_attributes = True
+
+
+class SearchHit(BaseModel):
+    type: str
+    id: int
+    label: str
+    detail: Optional[str] = None
+    score: float
+
+
 class UserBase(BaseModel):
     username: str
     role: str = Field("teacher", description="admin/teacher")
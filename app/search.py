@@ -0,0 +1,194 @@
+from __future__ import annotations
+
+import re
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from .models import Course, Student
+
+# FTS5 tables keyed by the entity id (rowid), so updates and deletes are point operations.
+_FTS_TABLES = {
+    "student": (
+        "students_fts",
+        "CREATE VIRTUAL TABLE IF NOT EXISTS students_fts USING fts5("
+        "full_name, email, tokenize='unicode61 remove_diacritics 2', prefix='1 2 3')",
+    ),
+    "course": (
+        "courses_fts",
+        "CREATE VIRTUAL TABLE IF NOT EXISTS courses_fts USING fts5("
+        "name, teacher_name, tokenize='unicode61 remove_diacritics 2', prefix='1 2 3')",
+    ),
+}
+
+_fts_enabled = False
+
+
+def ensure_search_index(bind: Engine) -> bool:
+    """Create the FTS5 tables (and fill them on first run). Falls back to LIKE without FTS5."""
+    global _fts_enabled
+    try:
+        with bind.begin() as conn:
+            created = False
+            for table, ddl in _FTS_TABLES.values():
+                exists = conn.execute(
+                    text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                    {"name": table},
+                ).first()
+                if not exists:
+                    conn.execute(text(ddl))
+                    created = True
+            if created:
+                _rebuild(conn)
+    except OperationalError:
+        _fts_enabled = False
+        return False
+    _fts_enabled = True
+    return True
+
+
+def index_student(db: Session, student: Student) -> None:
+    if not _fts_enabled:
+        return
+    db.execute(text("DELETE FROM students_fts WHERE rowid = :id"), {"id": student.id})
+    db.execute(
+        text("INSERT INTO students_fts(rowid, full_name, email) VALUES (:id, :full_name, :email)"),
+        {"id": student.id, "full_name": student.full_name, "email": student.email or ""},
+    )
+
+
+def remove_student(db: Session, student_id: int) -> None:
+    if _fts_enabled:
+        db.execute(text("DELETE FROM students_fts WHERE rowid = :id"), {"id": student_id})
+
+
+def index_course(db: Session, course: Course) -> None:
+    if not _fts_enabled:
+        return
+    db.execute(text("DELETE FROM courses_fts WHERE rowid = :id"), {"id": course.id})
+    db.execute(
+        text("INSERT INTO courses_fts(rowid, name, teacher_name) VALUES (:id, :name, :teacher_name)"),
+        {"id": course.id, "name": course.name, "teacher_name": course.teacher_name or ""},
+    )
+
+
+def remove_course(db: Session, course_id: int) -> None:
+    if _fts_enabled:
+        db.execute(text("DELETE FROM courses_fts WHERE rowid = :id"), {"id": course_id})
+
+
+def rebuild_search_index(db: Session) -> dict:
+    if not _fts_enabled:
+        return {"fts": False, "students": 0, "courses": 0}
+    counts = _rebuild(db.connection())
+    db.commit()
+    return {"fts": True, **counts}
+
+
+def _rebuild(conn) -> dict:
+    conn.execute(text("DELETE FROM students_fts"))
+    conn.execute(text("DELETE FROM courses_fts"))
+    students = conn.execute(
+        text(
+            "INSERT INTO students_fts(rowid, full_name, email) "
+            "SELECT id, full_name, coalesce(email, '') FROM students"
+        )
+    ).rowcount
+    courses = conn.execute(
+        text(
+            "INSERT INTO courses_fts(rowid, name, teacher_name) "
+            "SELECT id, name, coalesce(teacher_name, '') FROM courses"
+        )
+    ).rowcount
+    return {"students": students, "courses": courses}
+
+
+def _match_expression(query: str) -> str | None:
+    # Every word must match as a prefix: `kim yu` -> `"kim"* "yu"*`.
+    terms = [t.replace('"', "") for t in re.split(r"\s+", query.strip())]
+    terms = [t for t in terms if t]
+    if not terms:
+        return None
+    return " ".join(f'"{t}"*' for t in terms)
+
+
+def search(db: Session, query: str, kind: str | None = None, limit: int = 10) -> list[dict]:
+    kinds = [kind] if kind else list(_FTS_TABLES)
+    if not _fts_enabled:
+        return _search_like(db, query, kinds, limit)
+    match = _match_expression(query)
+    if not match:
+        return []
+    hits: list[dict] = []
+    if "student" in kinds:
+        rows = db.execute(
+            text(
+                "SELECT rowid, full_name, email, bm25(students_fts) AS rank FROM students_fts "
+                "WHERE students_fts MATCH :match ORDER BY rank LIMIT :limit"
+            ),
+            {"match": match, "limit": limit},
+        )
+        hits.extend(
+            _normalized(
+                {"type": "student", "id": r.rowid, "label": r.full_name, "detail": r.email or None, "score": -r.rank}
+                for r in rows
+            )
+        )
+    if "course" in kinds:
+        rows = db.execute(
+            text(
+                "SELECT rowid, name, teacher_name, bm25(courses_fts) AS rank FROM courses_fts "
+                "WHERE courses_fts MATCH :match ORDER BY rank LIMIT :limit"
+            ),
+            {"match": match, "limit": limit},
+        )
+        hits.extend(
+            _normalized(
+                {"type": "course", "id": r.rowid, "label": r.name, "detail": r.teacher_name or None, "score": -r.rank}
+                for r in rows
+            )
+        )
+    hits.sort(key=lambda h: h["score"], reverse=True)
+    return hits[:limit]
+
+
+def _normalized(hits) -> list[dict]:
+    # bm25 depends on each table's own term statistics, so raw scores from students_fts and
+    # courses_fts are not comparable; scale each table's hits to its best match (1.0) first.
+    hits = list(hits)
+    best = max((h["score"] for h in hits), default=0.0)
+    for hit in hits:
+        hit["score"] = round(hit["score"] / best, 4) if best > 0 else 0.0
+    return hits
+
+
+def _search_like(db: Session, query: str, kinds: list[str], limit: int) -> list[dict]:
+    # `%` and `_` typed by the user are literal characters, not wildcards.
+    escaped = query.strip().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    pattern = f"{escaped}%"
+    hits: list[dict] = []
+    if "student" in kinds:
+        rows = db.execute(
+            text(
+                "SELECT id, full_name, email FROM students "
+                "WHERE full_name LIKE :p ESCAPE '\\' OR email LIKE :p ESCAPE '\\' ORDER BY full_name LIMIT :limit"
+            ),
+            {"p": pattern, "limit": limit},
+        )
+        hits.extend(
+            {"type": "student", "id": r.id, "label": r.full_name, "detail": r.email, "score": 0.0} for r in rows
+        )
+    if "course" in kinds:
+        rows = db.execute(
+            text(
+                "SELECT id, name, teacher_name FROM courses "
+                "WHERE name LIKE :p ESCAPE '\\' OR teacher_name LIKE :p ESCAPE '\\' ORDER BY name LIMIT :limit"
+            ),
+            {"p": pattern, "limit": limit},
+        )
+        hits.extend(
+            {"type": "course", "id": r.id, "label": r.name, "detail": r.teacher_name, "score": 0.0} for r in rows
+        )
+    return hits[:limit]
@@ -4,7 +4,7 @@ from typing import Optional
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 
-from .config import ALGORITHM, SECRET_KEY, ACCESS_TOKEN_EXPIRE
+from .config import ALGORITHM, SECRET_KEY, ACCESS_TOKEN_EXPIRE, DEFAULT_TENANT
 
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -18,16 +18,21 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
-def create_access_token(subject: str, expires_delta: Optional[timedelta] = None) -> str:
+def create_access_token(
+    subject: str, expires_delta: Optional[timedelta] = None, tenant: str = DEFAULT_TENANT
+) -> str:
     expire = datetime.utcnow() + (expires_delta or ACCESS_TOKEN_EXPIRE)
-    to_encode = {"sub": subject, "exp": expire}
+    to_encode = {"sub": subject, "exp": expire, "tenant": tenant}
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
 
-def decode_access_token(token: str) -> Optional[str]:
+def decode_access_token(token: str, tenant: str = DEFAULT_TENANT) -> Optional[str]:
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return payload.get("sub")
     except JWTError:
         return None
+    # Usernames repeat across schools; a token is only valid for the tenant that issued it.
+    if payload.get("tenant", DEFAULT_TENANT) != tenant:
+        return None
+    return payload.get("sub")
@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+from typing import Iterator
+
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import Select
+
+from .config import STREAM_BATCH_SIZE
+
+STREAM_MEDIA_TYPES = {
+    "json": "application/json",
+    "ndjson": "application/x-ndjson",
+}
+
+_FLUSH_BYTES = 64 * 1024
+
+
+def stream_rows(
+    stmt: Select,
+    schema: type[BaseModel],
+    fmt: str,
+    bind: Engine,
+    headers: dict[str, str] | None = None,
+) -> StreamingResponse:
+    """Serialize a query as a JSON array or NDJSON while it is being read.
+
+    Rows are fetched with ``yield_per`` on a dedicated session over ``bind`` (the
+    request session is closed before the body is sent), so memory stays flat
+    regardless of table size. The cursor stays open for the whole transfer; tenant
+    databases run in WAL mode, so a slow client does not hold writers off.
+    """
+    return StreamingResponse(
+        _generate(stmt, schema, fmt, bind), media_type=STREAM_MEDIA_TYPES[fmt], headers=headers
+    )
+
+
+def _generate(stmt: Select, schema: type[BaseModel], fmt: str, bind: Engine) -> Iterator[bytes]:
+    ndjson = fmt == "ndjson"
+    buffer: list[bytes] = [] if ndjson else [b"["]
+    size = 0
+    first = True
+    with Session(bind=bind) as db:
+        for obj in db.scalars(stmt.execution_options(yield_per=STREAM_BATCH_SIZE)):
+            item = schema.model_validate(obj).model_dump_json().encode()
+            if ndjson:
+                buffer.append(item + b"\n")
+            else:
+                buffer.append(item if first else b"," + item)
+            first = False
+            size += len(item) + 1
+            if size >= _FLUSH_BYTES:
+                yield b"".join(buffer)
+                buffer.clear()
+                size = 0
+    if not ndjson:
+        buffer.append(b"]")
+    if buffer:
+        yield b"".join(buffer)
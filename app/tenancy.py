@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+import argparse
+import contextlib
+import os
+import secrets
+import sqlite3
+import time
+from typing import Iterator
+
+from pydantic import ValidationError
+from sqlalchemy.exc import IntegrityError
+
+from . import archive, changelog, crud, schemas, search
+from .asgi import send_json
+from .config import DEFAULT_TENANT, TENANT_DATA_DIR, TENANT_HEADER, TENANT_HOST_SUFFIX
+from .database import TENANT_NAME, Base, TenantDatabase, current_tenant, tenant_paths, tenants
+from .metrics import metrics
+
+_HEADER = TENANT_HEADER.lower().encode("latin-1")
+
+
+def init_tenant_database(tenant: TenantDatabase) -> None:
+    """Schema (and its upgrades), search index and change-log seed for a newly opened tenant.
+
+    Only the default tenant keeps the demo ``admin / admin123`` login; other schools get
+    their admin when provisioned (``python -m app.tenancy create``), never a shared password.
+    """
+    Base.metadata.create_all(bind=tenant.engine)
+    archive.ensure_autoincrement(tenant)
+    search.ensure_search_index(tenant.engine)
+    changelog.backfill_change_log(tenant.engine)
+    if tenant.name == DEFAULT_TENANT:
+        create_admin(tenant, "admin", "admin123")
+
+
+def create_admin(tenant: TenantDatabase, username: str, password: str) -> bool:
+    """Add an admin account unless the username exists; False if it already did."""
+    token = current_tenant.set(tenant.name)
+    try:
+        with tenant.SessionLocal() as db:
+            if crud.get_user_by_username(db, username):
+                return False
+            try:
+                crud.create_user(db, schemas.UserCreate(username=username, password=password, role="admin"))
+            except IntegrityError:
+                # Another worker seeding the same file got there first.
+                return False
+            return True
+    finally:
+        current_tenant.reset(token)
+
+
+tenants.on_open.append(init_tenant_database)
+
+
+@contextlib.contextmanager
+def scratch_tenant(prefix: str, copy_from: str | None = None) -> Iterator[tuple[TenantDatabase, dict]]:
+    """Throwaway tenant for benchmarks, optionally a copy of ``copy_from``'s database.
+
+    Yields the tenant and the credentials of an admin with a random password; the
+    tenant's files are deleted on exit, so nothing the run writes outlives it.
+    """
+    name = f"{prefix}-{secrets.token_hex(4)}"
+    try:
+        if copy_from is not None:
+            os.makedirs(TENANT_DATA_DIR, exist_ok=True)
+            source = sqlite3.connect(tenants.get(copy_from).path)
+            target = sqlite3.connect(tenant_paths(name)[0])
+            try:
+                source.backup(target)
+            finally:
+                target.close()
+                source.close()
+        tenant = tenants.get(name)
+        credentials = {"username": f"{name}-admin", "password": secrets.token_urlsafe(16)}
+        create_admin(tenant, **credentials)
+        yield tenant, credentials
+    finally:
+        tenants.remove(name)
+
+
+def resolve_tenant(scope) -> str:
+    """Tenant from the Host subdomain (when TENANT_HOST_SUFFIX is set), then the header."""
+    headers = dict(scope["headers"])
+    if TENANT_HOST_SUFFIX:
+        host = headers.get(b"host", b"").decode("latin-1").split(":", 1)[0].lower()
+        if host.endswith(TENANT_HOST_SUFFIX) and len(host) > len(TENANT_HOST_SUFFIX):
+            return host[: -len(TENANT_HOST_SUFFIX)]
+    name = headers.get(_HEADER)
+    if name:
+        return name.decode("latin-1").strip().lower()
+    return DEFAULT_TENANT
+
+
+class TenantMiddleware:
+    """Routes each request to its school's database and records per-tenant metrics."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        name = resolve_tenant(scope)
+        if not tenants.allowed(name):
+            return await send_json(send, 404, {"detail": "Unknown tenant"})
+
+        status = 500
+        started = time.monotonic()
+
+        async def tracking_send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        token = current_tenant.set(name)
+        try:
+            await self.app(scope, receive, tracking_send)
+        finally:
+            current_tenant.reset(token)
+            metrics.inc("http_requests", tenant=name)
+            if status >= 500:
+                metrics.inc("http_errors", tenant=name)
+            metrics.observe("http_request_ms", (time.monotonic() - started) * 1000, tenant=name)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Provision school tenants.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    create = sub.add_parser("create", help="create and initialize a tenant database")
+    create.add_argument("name")
+    create.add_argument("--admin-user", default="admin")
+    create.add_argument(
+        "--admin-password",
+        default=os.getenv("TENANT_ADMIN_PASSWORD"),
+        help="password for the school's admin (default: $TENANT_ADMIN_PASSWORD, else a random one is printed)",
+    )
+    args = parser.parse_args(argv)
+
+    if args.command == "create":
+        if not TENANT_NAME.match(args.name):
+            parser.error(f"invalid tenant name: {args.name!r}")
+        password = args.admin_password or secrets.token_urlsafe(12)
+        # Check the account before the tenant file exists, so a bad password leaves nothing behind.
+        try:
+            schemas.UserCreate(username=args.admin_user, password=password, role="admin")
+        except ValidationError as exc:
+            parser.error("; ".join(f"admin {err['loc'][0]}: {err['msg']}" for err in exc.errors()))
+        tenant = tenants.get(args.name)
+        print(f"tenant {tenant.name}: {tenant.path}")
+        if create_admin(tenant, args.admin_user, password):
+            shown = "(as given)" if args.admin_password else password
+            print(f"admin {args.admin_user} / {shown}")
+        else:
+            print(f"admin {args.admin_user} already exists; password unchanged")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
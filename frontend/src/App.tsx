@@ -1,17 +1,21 @@
-import { useEffect, useMemo, useState } from 'react';
+import { useCallback, useEffect, useMemo, useState } from 'react';
 import type { SVGProps } from 'react';
 import {
   api,
+  cachedGet,
   Assessment,
   AttendanceRecord,
-  AttendanceSummary,
   Course,
   CourseGradeSummary,
+  Dashboard,
   GradeSummary,
   Score,
   Session,
   Student,
   login,
+  peekQuery,
+  subscribeAttendance,
+  subscribeQuery,
 } from './api';
 
 type SvgIcon = (props: SVGProps<SVGSVGElement>) => JSX.Element;
@@ -146,6 +150,16 @@ function useLoad<T>(fetcher: () => Promise<T>, deps: unknown[] = []) {
   };
 }
 
+// useLoad over the shared query cache: re-renders when a background revalidation lands.
+function useQuery<T>(url: string) {
+  const result = useLoad<T>(() => cachedGet<T>(url), [url]);
+  const { setData } = result;
+
+  useEffect(() => subscribeQuery(url, () => setData(() => peekQuery<T>(url) ?? null)), [url]);
+
+  return result;
+}
+
 function LoginCard({ onSuccess }: { onSuccess: () => void }) {
   const [username, setUsername] = useState('admin');
   const [password, setPassword] = useState('admin123');
@@ -276,38 +290,20 @@ function StatusLegend({ items, title = '상태 레전드' }: { items: { label: s
 }
 
 function DashboardSection({ go, role }: { go: (tab: Tab) => void; role: Role }) {
-  const { data: students } = useLoad<Student[]>(async () => (await api.get('/students')).data, []);
-  const { data: courses } = useLoad<Course[]>(async () => (await api.get('/courses')).data, []);
+  const { data: dashboard } = useQuery<Dashboard>('/dashboard');
+  const students = dashboard?.students;
+  const courses = dashboard?.courses;
   const [selectedCourseId, setSelectedCourseId] = useState<number | null>(null);
-  const [attendanceSummary, setAttendanceSummary] = useState<AttendanceSummary | null>(null);
-  const [courseGrade, setCourseGrade] = useState<CourseGradeSummary | null>(null);
   const courseId = selectedCourseId ?? courses?.[0]?.id;
+  const courseStats = dashboard?.course_stats.find((c) => c.course_id === courseId) ?? null;
 
-  useEffect(() => {
-    if (!courseId) {
-      setAttendanceSummary(null);
-      setCourseGrade(null);
-      return;
-    }
-    api
-      .get<AttendanceSummary>(`/courses/${courseId}/attendance/summary`)
-      .then((res) => setAttendanceSummary(res.data))
-      .catch(() => setAttendanceSummary(null));
-    api
-      .get<CourseGradeSummary>(`/courses/${courseId}/grades/summary`)
-      .then((res) => setCourseGrade(res.data))
-      .catch(() => setCourseGrade(null));
-  }, [courseId]);
-
-  const totalStudents = students?.length ?? 0;
-  const totalCourses = courses?.length ?? 0;
+  const totalStudents = dashboard?.counts.students ?? 0;
+  const totalCourses = dashboard?.counts.courses ?? 0;
 
   const attendanceRate =
-    attendanceSummary && attendanceSummary.session_count > 0
+    courseStats && courseStats.session_count > 0
       ? `${Math.round(
-          (attendanceSummary.present /
-            Math.max(attendanceSummary.present + attendanceSummary.absent + attendanceSummary.late + attendanceSummary.excused, 1)) *
-            100,
+          (courseStats.present / Math.max(courseStats.present + courseStats.absent + courseStats.late + courseStats.excused, 1)) * 100,
         )}%`
       : '-';
 
@@ -371,7 +367,7 @@ function DashboardSection({ go, role }: { go: (tab: Tab) => void; role: Role })
           </div>
           <div>
             <div className="stat-label">평균 성적</div>
-            <div className="stat-value">{courseGrade?.average_score ?? '-'}</div>
+            <div className="stat-value">{courseStats?.average_score ?? '-'}</div>
           </div>
         </div>
       </div>
@@ -407,8 +403,8 @@ function DashboardSection({ go, role }: { go: (tab: Tab) => void; role: Role })
               {recentStudents.map((s) => (
                 <li key={s.id} className="list-item">
                   <div>
-                    <div className="list-title">{s.full_name}</div>
-                    <div className="list-sub">{s.email || '-'}</div>
+                    <div className="list-title">{s.name}</div>
+                    <div className="list-sub">{s.detail || '-'}</div>
                   </div>
                   <span className="badge">#{s.id}</span>
                 </li>
@@ -429,7 +425,7 @@ function DashboardSection({ go, role }: { go: (tab: Tab) => void; role: Role })
                 <li key={c.id} className="list-item">
                   <div>
                     <div className="list-title">{c.name}</div>
-                    <div className="list-sub">{c.teacher_name || '-'}</div>
+                    <div className="list-sub">{c.detail || '-'}</div>
                   </div>
                   <span className="badge">#{c.id}</span>
                 </li>
@@ -443,7 +439,7 @@ function DashboardSection({ go, role }: { go: (tab: Tab) => void; role: Role })
 }
 
 function StudentsSection({ notify }: { notify: (type: Toast['type'], message: string) => void }) {
-  const { data: students, loading, error, setData } = useLoad<Student[]>(async () => (await api.get('/students')).data, []);
+  const { data: students, loading, error, setData } = useQuery<Student[]>('/students');
   const [form, setForm] = useState({ full_name: '', email: '', grade_level: '' });
   const [search, setSearch] = useState('');
   const [gradeFilter, setGradeFilter] = useState('');
@@ -575,7 +571,7 @@ function StudentsSection({ notify }: { notify: (type: Toast['type'], message: st
 }
 
 function CoursesSection({ notify }: { notify: (type: Toast['type'], message: string) => void }) {
-  const { data: courses, loading, error, setData } = useLoad<Course[]>(async () => (await api.get('/courses')).data, []);
+  const { data: courses, loading, error, setData } = useQuery<Course[]>('/courses');
   const [form, setForm] = useState({ name: '', teacher_name: '' });
 
   const addCourse = async () => {
@@ -642,8 +638,8 @@ function CoursesSection({ notify }: { notify: (type: Toast['type'], message: str
 }
 
 function AttendanceSection({ notify }: { notify: (type: Toast['type'], message: string) => void }) {
-  const { data: courses } = useLoad<Course[]>(async () => (await api.get('/courses')).data, []);
-  const { data: students } = useLoad<Student[]>(async () => (await api.get('/students')).data, []);
+  const { data: courses } = useQuery<Course[]>('/courses');
+  const { data: students } = useQuery<Student[]>('/students');
   const [selectedCourse, setSelectedCourse] = useState<number | null>(null);
   const [sessions, setSessions] = useState<Session[] | null>(null);
   const [records, setRecords] = useState<AttendanceRecord[] | null>(null);
@@ -668,7 +664,7 @@ function AttendanceSection({ notify }: { notify: (type: Toast['type'], message:
     setRecords(null);
   }, [courseId]);
 
-  useEffect(() => {
+  const loadRecords = useCallback(() => {
     if (!courseId || !selectedSession) return;
     api
       .get<AttendanceRecord[]>(`/courses/${courseId}/attendance/sessions/${selectedSession}/records`)
@@ -676,6 +672,26 @@ function AttendanceSection({ notify }: { notify: (type: Toast['type'], message:
       .catch(() => setRecords(null));
   }, [courseId, selectedSession]);
 
+  useEffect(() => {
+    loadRecords();
+  }, [loadRecords]);
+
+  useEffect(() => {
+    if (!selectedSession) return;
+    return subscribeAttendance(
+      selectedSession,
+      (event) => {
+        setRecords((prev) => {
+          const byStudent = new Map((prev || []).map((r) => [r.student_id, r]));
+          event.records.forEach((r) => byStudent.set(r.student_id, r));
+          return Array.from(byStudent.values()).sort((a, b) => a.student_id - b.student_id);
+        });
+      },
+      // The server could not replay the missed events; reload the whole board.
+      loadRecords,
+    );
+  }, [selectedSession, loadRecords]);
+
   const createSession = async () => {
     if (!courseId) return;
     const res = await api.post<Session>(`/courses/${courseId}/attendance/sessions`, {});
@@ -791,7 +807,7 @@ function AttendanceSection({ notify }: { notify: (type: Toast['type'], message:
 }
 
 function AssignmentsSection() {
-  const { data: courses } = useLoad<Course[]>(async () => (await api.get('/courses')).data, []);
+  const { data: courses } = useQuery<Course[]>('/courses');
   const [selectedCourse, setSelectedCourse] = useState<number | null>(null);
   const [assessments, setAssessments] = useState<Assessment[] | null>(null);
   const courseId = selectedCourse ?? courses?.[0]?.id ?? null;
@@ -847,8 +863,8 @@ function AssignmentsSection() {
 }
 
 function GradesSection({ notify }: { notify: (type: Toast['type'], message: string) => void }) {
-  const { data: courses } = useLoad<Course[]>(async () => (await api.get('/courses')).data, []);
-  const { data: students } = useLoad<Student[]>(async () => (await api.get('/students')).data, []);
+  const { data: courses } = useQuery<Course[]>('/courses');
+  const { data: students } = useQuery<Student[]>('/students');
   const [selectedCourse, setSelectedCourse] = useState<number | null>(null);
   const [selectedStudent, setSelectedStudent] = useState<number | null>(null);
   const [assessments, setAssessments] = useState<Assessment[] | null>(null);
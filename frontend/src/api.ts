@@ -15,6 +15,107 @@ api.interceptors.request.use((config) => {
   return config;
 });
 
+// Shared GET cache: in-flight dedup, stale-while-revalidate, ETag revalidation.
+type QueryEntry = {
+  data?: unknown;
+  etag?: string;
+  fetchedAt: number;
+  promise?: Promise<unknown>;
+  listeners: Set<() => void>;
+};
+
+export const STALE_MS = 30_000;
+const queryCache = new Map<string, QueryEntry>();
+
+// Switched off by the request-count benchmark to measure plain per-mount fetching.
+export const queryCacheConfig = { enabled: true };
+
+export const clearQueryCache = () => queryCache.clear();
+
+const queryEntry = (url: string) => {
+  let entry = queryCache.get(url);
+  if (!entry) {
+    entry = { fetchedAt: 0, listeners: new Set() };
+    queryCache.set(url, entry);
+  }
+  return entry;
+};
+
+const revalidate = <T,>(url: string): Promise<T> => {
+  const entry = queryEntry(url);
+  if (entry.promise) return entry.promise as Promise<T>;
+  const promise = api
+    .get<T>(url, {
+      headers: entry.etag && entry.data !== undefined ? { 'If-None-Match': entry.etag } : {},
+      validateStatus: (status) => (status >= 200 && status < 300) || status === 304,
+    })
+    .then((res) => {
+      if (res.status !== 304) {
+        entry.data = res.data;
+        entry.etag = res.headers['etag'];
+      }
+      entry.fetchedAt = Date.now();
+      entry.listeners.forEach((listener) => listener());
+      return entry.data as T;
+    })
+    .finally(() => {
+      entry.promise = undefined;
+    });
+  entry.promise = promise;
+  return promise;
+};
+
+export const cachedGet = <T,>(url: string): Promise<T> => {
+  if (!queryCacheConfig.enabled) return api.get<T>(url).then((res) => res.data);
+  const entry = queryCache.get(url);
+  if (entry?.data !== undefined) {
+    if (Date.now() - entry.fetchedAt > STALE_MS) revalidate(url).catch(() => undefined);
+    return Promise.resolve(entry.data as T);
+  }
+  return revalidate<T>(url);
+};
+
+export const peekQuery = <T,>(url: string) => queryCache.get(url)?.data as T | undefined;
+
+export const subscribeQuery = (url: string, listener: () => void) => {
+  const entry = queryEntry(url);
+  entry.listeners.add(listener);
+  return () => {
+    entry.listeners.delete(listener);
+  };
+};
+
+export const invalidateQueries = (prefixes: string[]) => {
+  queryCache.forEach((entry, url) => {
+    if (!prefixes.some((p) => url.startsWith(p))) return;
+    entry.fetchedAt = 0;
+    if (entry.listeners.size > 0) revalidate(url).catch(() => undefined);
+  });
+};
+
+// Which cached reads a successful write can affect.
+const invalidationTargets = (url: string) => {
+  const resource = url.split('?')[0].split('/')[1];
+  switch (resource) {
+    case 'students':
+      return ['/students', '/dashboard', '/search', '/courses/'];
+    case 'courses':
+      return ['/courses', '/dashboard', '/search'];
+    case 'sessions':
+      return ['/sessions/', '/courses/', '/dashboard'];
+    case 'assessments':
+      return ['/courses/', '/students/', '/dashboard'];
+    default:
+      return [];
+  }
+};
+
+api.interceptors.response.use((res) => {
+  const method = (res.config.method || 'get').toLowerCase();
+  if (method !== 'get' && res.config.url) invalidateQueries(invalidationTargets(res.config.url));
+  return res;
+});
+
 export type Student = {
   id: number;
   full_name: string;
@@ -85,6 +186,26 @@ export type CourseGradeSummary = {
   assessments: Assessment[];
 };
 
+export type IndexEntry = {
+  id: number;
+  name: string;
+  detail?: string | null;
+};
+
+export type CourseStats = AttendanceSummary & {
+  course_name: string;
+  average_score?: number | null;
+};
+
+export type Dashboard = {
+  version: number;
+  counts: { students: number; courses: number; sessions: number; assessments: number };
+  recent_sessions: { id: number; course_id: number; course_name: string; session_date: string; topic?: string | null }[];
+  course_stats: CourseStats[];
+  students: IndexEntry[];
+  courses: IndexEntry[];
+};
+
 export const login = async (username: string, password: string) => {
   const params = new URLSearchParams();
   params.append('username', username);
@@ -95,5 +216,24 @@ export const login = async (username: string, password: string) => {
   });
   const token = res.data.access_token;
   localStorage.setItem('token', token);
+  clearQueryCache();
   return token;
 };
+
+export type AttendanceEvent = {
+  session_id: number;
+  course_id: number | null;
+  records: AttendanceRecord[];
+};
+
+export const subscribeAttendance = (
+  sessionId: number,
+  onEvent: (event: AttendanceEvent) => void,
+  onReset?: () => void,
+) => {
+  const token = localStorage.getItem('token') || '';
+  const source = new EventSource(`${API_BASE}/sessions/${sessionId}/attendance/stream?access_token=${encodeURIComponent(token)}`);
+  source.addEventListener('attendance', (e) => onEvent(JSON.parse((e as MessageEvent).data)));
+  source.addEventListener('reset', () => onReset?.());
+  return () => source.close();
+};
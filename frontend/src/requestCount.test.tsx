@@ -0,0 +1,127 @@
+// @vitest-environment jsdom
+// Request-count benchmark for the shared query cache: `npm run bench:requests`.
+// Mounts the app against a counting axios adapter, walks a fixed tab sequence and
+// prints the requests each navigation sends with the cache off (plain per-mount
+// fetching, as before the cache) and on.
+import { act, cleanup, fireEvent, render, screen, within } from '@testing-library/react';
+import { AxiosHeaders } from 'axios';
+import type { AxiosAdapter, AxiosResponse } from 'axios';
+import { afterEach, expect, test, vi } from 'vitest';
+import App from './App';
+import { STALE_MS, api, clearQueryCache, queryCacheConfig } from './api';
+
+const ETAG = 'W/"default-1"';
+const SHARED_QUERIES = ['/students', '/courses', '/dashboard'];
+
+const fixtures: Record<string, unknown> = {
+  '/students': [
+    { id: 1, full_name: 'Kim Yuna', email: null, grade_level: 'Grade 10' },
+    { id: 2, full_name: 'Lee Minho', email: null, grade_level: 'Grade 11' },
+  ],
+  '/courses': [{ id: 1, name: 'Math', subject: 'Math', class_name: '10-1', teacher_name: 'Park' }],
+  '/dashboard': {
+    version: 1,
+    counts: { students: 2, courses: 1, sessions: 0, assessments: 0 },
+    recent_sessions: [],
+    course_stats: [],
+    students: [
+      { id: 1, name: 'Kim Yuna' },
+      { id: 2, name: 'Lee Minho' },
+    ],
+    courses: [{ id: 1, name: 'Math' }],
+  },
+  '/courses/1/grades/summary': { course_id: 1, course_name: 'Math', average_score: null, assessments: [] },
+};
+
+// Tab label to click, or null for the header's home button (dashboard).
+const NAVIGATION: { label: string | null; afterMs?: number }[] = [
+  { label: '학생등록' },
+  { label: '출결입력' },
+  { label: '평가/점수' },
+  { label: '과정관리' },
+  { label: '과제목록' },
+  { label: null },
+  { label: '출결입력' },
+  { label: '평가/점수', afterMs: STALE_MS + 1_000 },
+];
+
+type Sent = { url: string; status: number };
+
+let sent: Sent[] = [];
+let clockOffset = 0;
+
+const countingAdapter: AxiosAdapter = async (config) => {
+  const url = config.url || '';
+  const status = AxiosHeaders.from(config.headers).get('If-None-Match') === ETAG ? 304 : 200;
+  sent.push({ url, status });
+  const response: AxiosResponse = {
+    data: status === 304 ? '' : (fixtures[url] ?? []),
+    status,
+    statusText: status === 304 ? 'Not Modified' : 'OK',
+    headers: { etag: ETAG },
+    config,
+  };
+  return response;
+};
+
+const settle = () =>
+  act(async () => {
+    for (let i = 0; i < 5; i += 1) await new Promise((resolve) => setTimeout(resolve, 0));
+  });
+
+const walk = async (cacheEnabled: boolean) => {
+  queryCacheConfig.enabled = cacheEnabled;
+  clearQueryCache();
+  sent = [];
+  clockOffset = 0;
+  const summarize = (navigation: string, requests: Sent[]) => ({
+    navigation,
+    requests: requests.length,
+    sharedLists: requests.filter((r) => SHARED_QUERIES.includes(r.url)).length,
+    notModified: requests.filter((r) => r.status === 304).length,
+  });
+
+  render(<App />);
+  await settle();
+  const rows = [summarize('대시보드 (first load)', sent)];
+  for (const step of NAVIGATION) {
+    clockOffset += step.afterMs ?? 0;
+    const before = sent.length;
+    const tabbar = document.querySelector('.tabbar') as HTMLElement;
+    const button =
+      step.label === null
+        ? screen.getByRole('button', { name: 'Grade Management' })
+        : within(tabbar).getByRole('button', { name: step.label });
+    fireEvent.click(button);
+    await settle();
+    const label = (step.label ?? '대시보드') + (step.afterMs ? ` (+${step.afterMs / 1000}s)` : '');
+    rows.push(summarize(label, sent.slice(before)));
+  }
+  cleanup();
+  return { rows, total: sent.length };
+};
+
+afterEach(() => {
+  queryCacheConfig.enabled = true;
+  vi.restoreAllMocks();
+});
+
+test('requests per navigation with the shared cache off and on', async () => {
+  api.defaults.adapter = countingAdapter;
+  localStorage.setItem('token', 'benchmark');
+  const realNow = Date.now.bind(Date);
+  vi.spyOn(Date, 'now').mockImplementation(() => realNow() + clockOffset);
+
+  const uncached = await walk(false);
+  const cached = await walk(true);
+
+  console.log('\nshared cache off');
+  console.table(uncached.rows);
+  console.log('shared cache on');
+  console.table(cached.rows);
+  console.log(`total requests: off ${uncached.total}, on ${cached.total}`);
+
+  const fullReads = (rows: { sharedLists: number; notModified: number }[]) =>
+    rows.reduce((sum, row) => sum + row.sharedLists - row.notModified, 0);
+  expect(fullReads(cached.rows)).toBeLessThan(fullReads(uncached.rows));
+});